@@ -1,11 +1,41 @@
-from .app import Colas
-from .queue import Queue
-from .stream import Stream
-from .task import Task
+from .app import (
+    BatchTaskHandle,
+    Colas,
+    StreamingTaskHandle,
+    StreamingTaskResult,
+    TaskError,
+    TaskHandle,
+    TaskResult,
+)
+from .chain import Chain, chain
+from .queue import Queue, QueueFull, QueueStats
+from .ratelimit import RateLimiter
+from .sharding import ShardedQueue, ShardedStream
+from .stream import Stream, StreamStats
+from .task import Signature, Task
+from .trace import JsonLinesExporter, SpanExporter, breakdown
 
 __all__ = [
+    "BatchTaskHandle",
+    "Chain",
     "Colas",
+    "JsonLinesExporter",
     "Queue",
+    "QueueFull",
+    "QueueStats",
+    "RateLimiter",
+    "ShardedQueue",
+    "ShardedStream",
+    "Signature",
+    "SpanExporter",
     "Stream",
+    "StreamStats",
+    "StreamingTaskHandle",
+    "StreamingTaskResult",
     "Task",
+    "TaskError",
+    "TaskHandle",
+    "TaskResult",
+    "breakdown",
+    "chain",
 ]
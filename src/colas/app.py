@@ -1,39 +1,209 @@
-from typing import Any, Callable, Coroutine
+import asyncio
+import inspect
+import os
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Coroutine
+from contextlib import suppress
+from dataclasses import replace
+from datetime import datetime, timedelta
+from functools import partial, update_wrapper
+from typing import Any, Literal, overload
 from urllib.parse import urlparse
-from uuid import uuid4
+from uuid import UUID, uuid4
 
-from .queue import Queue
+import msgpack  # type: ignore
+
+from .autoscale import Autoscaler, Slots
+from .chain import Chain
+from .durability import Durability
+from .queue import Overflow, Queue
+from .ratelimit import RateLimiter, Throttle, parse_rate
+from .sharding import ShardedQueue, ShardedStream
 from .stream import Stream
-from .task import Task
+from .task import Signature, Task, decode, encode, pack_result, unpack_result
+from .trace import SpanExporter, Trace, new_trace
+
+
+class TaskError(Exception):
+    def __init__(self, task_id: UUID, error_type: str, message: str):
+        super().__init__(
+            f"Task {task_id} failed with {error_type}: {message}"
+            if message
+            else f"Task {task_id} failed with {error_type}"
+        )
+        self.task_id = task_id
+        self.error_type = error_type
+        self.message = message
+
+
+class TaskResult:
+    def __init__(
+        self,
+        app: "Colas",
+        task_id: UUID,
+        execution: asyncio.Task[Any] | None = None,
+    ) -> None:
+        self._app = app
+        self.task_id = task_id
+        self._execution = execution
+
+    async def wait(self, timeout: float | None = None) -> Any:
+        if self._execution is None:
+            result, _ = await self._app._wait(self.task_id, timeout)
+            return result
+        async with asyncio.timeout(timeout):
+            return await asyncio.shield(self._execution)
+
+
+class StreamingTaskResult:
+    def __init__(self, task_id: UUID, chunks: AsyncIterator[Any]) -> None:
+        self.task_id = task_id
+        self._chunks = chunks
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._chunks
+
+
+class TaskHandle:
+    def __init__(self, app: "Colas", func: Callable[..., Any]) -> None:
+        update_wrapper(self, func)
+        self._app = app
+        self.name = func.__name__
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._app._execute_handler(self.name, *args, **kwargs)
+
+    async def apply(
+        self,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        task = Task(task_id=uuid4(), name=self.name, args=args, kwargs=kwargs or {})
+        return await self._app._submit(task, eager, timeout=timeout)
+
+    async def apply_at(
+        self,
+        when: datetime,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+    ) -> TaskResult:
+        task = Task(task_id=uuid4(), name=self.name, args=args, kwargs=kwargs or {})
+        return await self._app._schedule(task, eager, when.timestamp())
+
+    async def apply_in(
+        self,
+        delay: float | timedelta,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+    ) -> TaskResult:
+        return await self.apply_at(datetime.now() + _delta(delay), args, kwargs, eager)
+
+    async def traced(self, *args: Any, **kwargs: Any) -> tuple[Any, Trace]:
+        task = Task(task_id=uuid4(), name=self.name, args=args, kwargs=kwargs)
+        return await self._app._submit_traced(task)
+
+    def s(self, *args: Any, **kwargs: Any) -> Signature:
+        return Signature(name=self.name, args=args, kwargs=kwargs)
+
+
+class BatchTaskHandle(TaskHandle):
+    async def __call__(self, item: Any) -> Any:  # type: ignore[override]
+        return await self._app._execute_handler(self.name, item)
+
+    def s(self, *items: Any) -> Signature:  # type: ignore[override]
+        if len(items) > 1:
+            raise TypeError(f"Batch task {self.name} takes at most one item")
+        return Signature(name=self.name, args=items, kwargs={})
+
+
+class StreamingTaskHandle(TaskHandle):
+    def __call__(  # type: ignore[override]
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        return self._app._execute_streaming(self.name, *args, **kwargs)
+
+    def apply(  # type: ignore[override]
+        self,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+    ) -> AsyncIterator[Any]:
+        task = Task(task_id=uuid4(), name=self.name, args=args, kwargs=kwargs or {})
+        return self._app._stream(task, eager)
+
+    async def apply_at(  # type: ignore[override]
+        self,
+        when: datetime,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+    ) -> StreamingTaskResult:
+        task = Task(task_id=uuid4(), name=self.name, args=args, kwargs=kwargs or {})
+        return await self._app._schedule_stream(task, eager, when.timestamp())
+
+    async def apply_in(  # type: ignore[override]
+        self,
+        delay: float | timedelta,
+        args: tuple = (),
+        kwargs: dict[str, Any] | None = None,
+        eager: bool | None = None,
+    ) -> StreamingTaskResult:
+        return await self.apply_at(datetime.now() + _delta(delay), args, kwargs, eager)
 
 
 class Colas:
-    def __init__(self) -> None:
-        self._tasks: dict[str, Callable[..., Coroutine[Any, Any, Any]]] = {}
+    def __init__(
+        self, eager: bool = False, exporter: SpanExporter | None = None
+    ) -> None:
+        self.eager = eager
+        self.exporter = exporter
+        self._tasks: dict[str, Callable[..., Any]] = {}
+        self._batches: dict[str, tuple[int, float]] = {}
+        self._push_limits: dict[str, RateLimiter] = {}
+        self._throttles: dict[str, Throttle] = {}
+        self._timeouts: dict[str, float] = {}
+        self._scheduled: set[asyncio.Task[Any]] = set()
         self.queue: Queue | None = None
         self.stream: Stream | None = None
 
-    async def connect(self, dsn: str) -> None:
-        parsed = urlparse(dsn)
+    async def connect(
+        self,
+        dsn: str | list[str],
+        shards: int = 1,
+        max_depth: int | None = None,
+        overflow: Overflow = "wait",
+        route: Callable[[Task], str] | None = None,
+        queue_durability: Durability = "durable",
+        stream_durability: Durability = "durable",
+    ) -> None:
+        dsns = [dsn] if isinstance(dsn, str) else list(dsn)
+        if shards > 1:
+            if len(dsns) != 1:
+                raise ValueError("Pass either several DSNs or a shard count")
+            dsns = _shard_dsns(dsns[0], shards)
 
-        match parsed.scheme:
-            case "postgresql" | "postgres":
-                from .postgres.connection import create_connection_pool  # noqa: WPS433
-                from .postgres.queue import PostgresQueue  # noqa: WPS433
-                from .postgres.stream import PostgresStream  # noqa: WPS433
+        if len(dsns) == 1:
+            self.queue, self.stream = await _open_backend(
+                dsns[0], queue_durability, stream_durability, max_depth, overflow
+            )
+            return
 
-                pool = await create_connection_pool(dsn)
-                self.queue = PostgresQueue(pool)
-                self.stream = PostgresStream(pool)
-            case "sqlite":
-                from .sqlite.queue import SqliteQueue  # noqa: WPS433
-                from .sqlite.stream import SqliteStream  # noqa: WPS433
-
-                filename = parsed.path
-                self.queue = SqliteQueue(filename)
-                self.stream = SqliteStream(filename)
-            case _:
-                raise ValueError(f"Unsupported DSN: {dsn}")
+        backends = [
+            await _open_backend(shard_dsn, queue_durability, stream_durability)
+            for shard_dsn in dsns
+        ]
+        self.queue = ShardedQueue(
+            [queue for queue, _ in backends],
+            route=route,
+            max_depth=max_depth,
+            overflow=overflow,
+        )
+        self.stream = ShardedStream([stream for _, stream in backends])
 
     async def init(self) -> None:
         if self.queue is None or self.stream is None:
@@ -42,34 +212,713 @@ class Colas:
         await self.queue.init(["tasks"])
         await self.stream.init(["results"])
 
+    async def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.flush()
+        if self.queue is not None:
+            await self.queue.close()
+        if self.stream is not None:
+            await self.stream.close()
+
+    @overload
+    def task(self, func: Callable[..., Any]) -> TaskHandle: ...
+
+    @overload
     def task(
-        self, func: Callable[..., Coroutine[Any, Any, Any]]
-    ) -> Callable[..., Coroutine[Any, Any, Any]]:
-        self._tasks[func.__name__] = func
+        self,
+        *,
+        push_rate: str | None = None,
+        rate_limit: str | None = None,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+    ) -> Callable[[Callable[..., Any]], TaskHandle]: ...
+
+    def task(
+        self,
+        func: Callable[..., Any] | None = None,
+        *,
+        push_rate: str | None = None,
+        rate_limit: str | None = None,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+    ) -> TaskHandle | Callable[[Callable[..., Any]], TaskHandle]:
+        def decorator(func: Callable[..., Any]) -> TaskHandle:
+            self._register(func, push_rate, rate_limit, max_concurrency, timeout)
+            if inspect.isasyncgenfunction(func):
+                return StreamingTaskHandle(self, func)
+            return TaskHandle(self, func)
+
+        return decorator if func is None else decorator(func)
+
+    def batch_task(
+        self,
+        max_size: int = 256,
+        max_wait: float = 0.02,
+        push_rate: str | None = None,
+        rate_limit: str | None = None,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+    ) -> Callable[
+        [Callable[[list[Any]], Coroutine[Any, Any, list[Any]]]], BatchTaskHandle
+    ]:
+        def decorator(
+            func: Callable[[list[Any]], Coroutine[Any, Any, list[Any]]],
+        ) -> BatchTaskHandle:
+            self._register(func, push_rate, rate_limit, max_concurrency, timeout)
+            self._batches[func.__name__] = (max_size, max_wait)
+            return BatchTaskHandle(self, func)
+
+        return decorator
 
-        async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: D401
-            return await self._execute_handler(func.__name__, *args, **kwargs)
+    def _register(
+        self,
+        func: Callable[..., Any],
+        push_rate: str | None,
+        rate_limit: str | None,
+        max_concurrency: int | None,
+        timeout: float | None = None,
+    ) -> None:
+        self._tasks[func.__name__] = func
+        if timeout is not None:
+            self._timeouts[func.__name__] = timeout
+        if push_rate is not None:
+            self._push_limits[func.__name__] = RateLimiter(parse_rate(push_rate))
+        if rate_limit is not None or max_concurrency is not None:
+            self._throttles[func.__name__] = Throttle(
+                RateLimiter(parse_rate(rate_limit)) if rate_limit else None,
+                max_concurrency,
+            )
 
-        return wrapper
+    async def apply(
+        self, workflow: Signature | Chain, eager: bool | None = None
+    ) -> Any:
+        steps = workflow.steps if isinstance(workflow, Chain) else (workflow,)
+        first, *rest = steps
+        for step in steps:
+            if inspect.isasyncgenfunction(self._tasks.get(step.name)):
+                raise TypeError(
+                    f"Streaming task {step.name} cannot be applied or chained"
+                )
+        for step in rest:
+            if step.name in self._batches and (step.args or step.kwargs):
+                raise TypeError(
+                    f"Batch task {step.name} takes its item from the previous step"
+                )
+        return await self._submit(
+            Task(
+                task_id=uuid4(),
+                name=first.name,
+                args=first.args,
+                kwargs=first.kwargs,
+                chain=tuple(rest),
+            ),
+            eager,
+        )
 
     async def _execute_handler(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._submit(
+            Task(
+                task_id=uuid4(),
+                name=name,
+                args=args,
+                kwargs=kwargs,
+            )
+        )
+
+    def _execute_streaming(
+        self, name: str, *args: Any, **kwargs: Any
+    ) -> AsyncGenerator[Any]:
+        return self._stream(Task(task_id=uuid4(), name=name, args=args, kwargs=kwargs))
+
+    async def _stream(
+        self, task: Task, eager: bool | None = None, run_at: float | None = None
+    ) -> AsyncGenerator[Any]:
+        if self.eager if eager is None else eager:
+            await _sleep_until(run_at)
+            task = decode(task.task_id, encode(task))
+            try:
+                async for chunk in self._tasks[task.name](*task.args, **task.kwargs):
+                    yield msgpack.unpackb(msgpack.packb(chunk))
+            except Exception as exc:
+                raise TaskError(task.task_id, *_error(exc)) from exc
+            return
+
+        if self.queue is None or self.stream is None:
+            raise RuntimeError("Must call connect() before using tasks")
+
+        await self._push(task, run_at)
+        async for chunk in self._chunks(task.task_id):
+            yield chunk
+
+    async def _chunks(self, task_id: UUID) -> AsyncGenerator[Any]:
+        if self.stream is None:
+            raise RuntimeError("Must call connect() before using tasks")
+
+        async for chunk in self.stream.iterate("results", task_id):
+            yield chunk
+        final = (await self.stream.retrieve("results", [task_id]))[task_id]
+        if not isinstance(final, int):
+            raise TaskError(task_id, *final[1])
+
+    async def _schedule(
+        self, task: Task, eager: bool | None, run_at: float
+    ) -> TaskResult:
+        _check_batch_call(task, self._batches)
+        if self.eager if eager is None else eager:
+            execution = asyncio.create_task(self._submit(task, True, run_at))
+            self._scheduled.add(execution)
+            execution.add_done_callback(self._scheduled.discard)
+            return TaskResult(self, task.task_id, execution)
+
+        await self._push(task, run_at)
+        return TaskResult(self, task.task_id)
+
+    async def _schedule_stream(
+        self, task: Task, eager: bool | None, run_at: float
+    ) -> StreamingTaskResult:
+        if self.eager if eager is None else eager:
+            return StreamingTaskResult(task.task_id, self._stream(task, True, run_at))
+
+        await self._push(task, run_at)
+        return StreamingTaskResult(task.task_id, self._chunks(task.task_id))
+
+    async def _submit(
+        self,
+        task: Task,
+        eager: bool | None = None,
+        run_at: float | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        result, _ = await self._submit_traced(task, eager, run_at, timeout)
+        return result
+
+    async def _submit_traced(
+        self,
+        task: Task,
+        eager: bool | None = None,
+        run_at: float | None = None,
+        timeout: float | None = None,
+    ) -> tuple[Any, Trace]:
+        _check_batch_call(task, self._batches)
+        if self.eager if eager is None else eager:
+            await _sleep_until(run_at)
+            return await self._run_eager(replace(task, trace=new_trace()))
+
         if self.queue is None or self.stream is None:
             raise RuntimeError("Must call connect() before using tasks")
 
-        task = Task(
-            task_id=uuid4(),
-            name=name,
-            args=args,
-            kwargs=kwargs,
+        await self._push(task, run_at)
+        return await self._wait(task.task_id, timeout)
+
+    async def _wait(
+        self, task_id: UUID, timeout: float | None = None
+    ) -> tuple[Any, Trace]:
+        if self.stream is None:
+            raise RuntimeError("Must call connect() before using tasks")
+
+        result, trace, error = unpack_result(
+            await self.stream.wait("results", task_id, timeout)
         )
-        await self.queue.push("tasks", task)
-        return await self.stream.wait("results", task.task_id)
+        if error is not None:
+            raise TaskError(task_id, *error)
+        trace["picked_up"] = time.time()
+        return result, trace
+
+    async def _run_eager(self, task: Task) -> tuple[Any, Trace]:
+        task = decode(task.task_id, encode(task))
+        func = self._tasks[task.name]
+        started = time.time()
+        try:
+            async with asyncio.timeout(self._timeouts.get(task.name)):
+                if task.name in self._batches:
+                    results = await func([task.args[0]])
+                    _check_batch_results(task.name, results, 1)
+                    (result,) = results
+                else:
+                    result = await func(*task.args, **task.kwargs)
+        except Exception as exc:
+            raise TaskError(task.task_id, *_error(exc)) from exc
+        finished = time.time()
+        result = msgpack.unpackb(msgpack.packb(result))
+
+        if task.chain:
+            return await self._run_eager(_next_step(task, result))
+        trace = {
+            **task.trace,
+            "popped": started,
+            "started": started,
+            "finished": finished,
+            "picked_up": time.time(),
+        }
+        return result, trace
 
-    async def run(self) -> None:
+    async def _push(self, task: Task, run_at: float | None = None) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before using tasks")
+
+        limiter = self._push_limits.get(task.name)
+        if limiter is not None:
+            await limiter.acquire()
+        trace = new_trace()
+        if run_at is not None:
+            trace["due"] = run_at
+        await self.queue.push("tasks", replace(task, trace=trace), run_at=run_at)
+
+    async def run(
+        self,
+        concurrency: int | Literal["auto"] = 1,
+        prefetch: int | None = None,
+        lease: float = 60.0,
+        max_deferred: int = 100,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+    ) -> None:
         if self.queue is None or self.stream is None:
             raise RuntimeError("Must call connect() before running")
 
-        async for task in self.queue.tasks("tasks"):
-            func = self._tasks[task.name]
-            result = await func(*task.args, **task.kwargs)
-            await self.stream.store("results", task.task_id, result)
+        scaler = None
+        if concurrency == "auto":
+            scaler = Autoscaler(min_concurrency, max_concurrency)
+            concurrency = scaler.concurrency
+        slots = Slots(concurrency)
+        wakeup = asyncio.Event()
+        room = asyncio.Event()
+        buffer: deque[tuple[int, Task]] = deque()
+        deferred: deque[tuple[int, Task]] = deque()
+        leased: set[int] = set()
+        collecting: dict[str, list[tuple[int, Task]]] = {}
+        released: list[tuple[int, Task]] = []
+        running: set[asyncio.Task[None]] = set()
+        errors: list[BaseException] = []
+
+        def capacity() -> int:
+            return slots.size if prefetch is None else prefetch
+
+        def done(task: Task, dispatched: float, execution: asyncio.Task[None]) -> None:
+            running.discard(execution)
+            slots.release()
+            if (throttle := self._throttles.get(task.name)) is not None:
+                throttle.release()
+            if scaler is not None:
+                ready = task.trace.get("due", task.trace.get("enqueued"))
+                scaler.observe(
+                    time.time() - dispatched,
+                    None if ready is None else dispatched - ready,
+                )
+            if not execution.cancelled() and execution.exception() is not None:
+                errors.append(execution.exception())  # type: ignore[arg-type]
+            wakeup.set()
+
+        def background_done(background: asyncio.Task[None]) -> None:
+            if not background.cancelled() and background.exception() is not None:
+                errors.append(background.exception())  # type: ignore[arg-type]
+            wakeup.set()
+
+        background = [
+            asyncio.create_task(
+                self._prefetch(buffer, leased, lease, wakeup, room, capacity)
+            ),
+            asyncio.create_task(self._renew(leased, lease)),
+        ]
+        if scaler is not None:
+            background.append(asyncio.create_task(self._autoscale(scaler, slots, room)))
+        for worker in background:
+            worker.add_done_callback(background_done)
+        try:
+            while True:
+                await slots.acquire()
+                if errors:
+                    raise errors[0]
+                claimed = self._next_task(
+                    buffer, deferred, max_deferred, collecting, released
+                )
+                if released:
+                    await self._release(released, leased)
+                    released.clear()
+                room.set()
+                if claimed is None:
+                    slots.release()
+                    wakeup.clear()
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(
+                            wakeup.wait(), timeout=self._idle_delay(deferred)
+                        )
+                    continue
+                execution = asyncio.create_task(
+                    self._process(claimed, leased, lease, collecting)
+                )
+                running.add(execution)
+                execution.add_done_callback(partial(done, claimed[0][1], time.time()))
+        finally:
+            for worker in background:
+                worker.cancel()
+            for execution in running:
+                execution.cancel()
+            if self.exporter is not None:
+                self.exporter.flush()
+
+    async def _prefetch(
+        self,
+        buffer: deque[tuple[int, Task]],
+        leased: set[int],
+        lease: float,
+        wakeup: asyncio.Event,
+        room: asyncio.Event,
+        capacity: Callable[[], int],
+    ) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        while True:
+            limit = capacity() - len(buffer)
+            if limit <= 0:
+                room.clear()
+                await room.wait()
+                continue
+            claimed = await self.queue.claim("tasks", limit, lease)
+            if not claimed:
+                await asyncio.sleep(await self.queue.poll_delay("tasks"))
+                continue
+            for receipt, task in claimed:
+                leased.add(receipt)
+                buffer.append((receipt, _popped(task)))
+            wakeup.set()
+
+    async def _renew(self, leased: set[int], lease: float) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        while True:
+            await asyncio.sleep(lease / 3)
+            await self.queue.renew("tasks", list(leased), lease)
+
+    async def _autoscale(
+        self, scaler: Autoscaler, slots: Slots, room: asyncio.Event
+    ) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        while True:
+            await asyncio.sleep(scaler.interval)
+            depth = await self.queue.estimated_depth("tasks")
+            slots.resize(scaler.update(depth))
+            room.set()
+
+    def _next_task(
+        self,
+        buffer: deque[tuple[int, Task]],
+        deferred: deque[tuple[int, Task]],
+        max_deferred: int,
+        collecting: dict[str, list[tuple[int, Task]]],
+        released: list[tuple[int, Task]],
+    ) -> list[tuple[int, Task]] | None:
+        for claimed in list(deferred):
+            if self._join(claimed, collecting):
+                deferred.remove(claimed)
+            elif self._admit(claimed[1]):
+                deferred.remove(claimed)
+                return self._coalesce(claimed, buffer, deferred)
+        while buffer:
+            claimed = buffer.popleft()
+            if self._join(claimed, collecting):
+                continue
+            if self._admit(claimed[1]):
+                return self._coalesce(claimed, buffer, deferred)
+            if len(deferred) < max_deferred:
+                deferred.append(claimed)
+            else:
+                released.append(claimed)
+        return None
+
+    async def _release(
+        self, released: list[tuple[int, Task]], leased: set[int]
+    ) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        by_delay: dict[float, list[int]] = {}
+        for receipt, task in released:
+            leased.discard(receipt)
+            delay = max(
+                self.queue.polling_interval, self._throttles[task.name].delay() or 0.0
+            )
+            by_delay.setdefault(delay, []).append(receipt)
+        for delay, receipts in by_delay.items():
+            await self.queue.renew("tasks", receipts, delay)
+
+    def _join(
+        self,
+        claimed: tuple[int, Task],
+        collecting: dict[str, list[tuple[int, Task]]],
+    ) -> bool:
+        name = claimed[1].name
+        batch = collecting.get(name)
+        if batch is None or len(batch) >= self._batches[name][0]:
+            return False
+        batch.append(claimed)
+        return True
+
+    def _coalesce(
+        self,
+        claimed: tuple[int, Task],
+        buffer: deque[tuple[int, Task]],
+        deferred: deque[tuple[int, Task]],
+    ) -> list[tuple[int, Task]]:
+        name = claimed[1].name
+        if name not in self._batches:
+            return [claimed]
+        max_size, _ = self._batches[name]
+        batch = [claimed]
+        for held in (deferred, buffer):
+            for mate in [mate for mate in held if mate[1].name == name]:
+                if len(batch) >= max_size:
+                    return batch
+                held.remove(mate)
+                batch.append(mate)
+        return batch
+
+    def _admit(self, task: Task) -> bool:
+        throttle = self._throttles.get(task.name)
+        return throttle is None or throttle.try_acquire()
+
+    def _idle_delay(self, deferred: deque[tuple[int, Task]]) -> float:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        delay = self.queue.polling_interval
+        for _, task in deferred:
+            task_delay = self._throttles[task.name].delay()
+            if task_delay is not None:
+                delay = min(delay, task_delay)
+        return delay
+
+    async def _process(
+        self,
+        claimed: list[tuple[int, Task]],
+        leased: set[int],
+        lease: float,
+        collecting: dict[str, list[tuple[int, Task]]],
+    ) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        try:
+            if claimed[0][1].name in self._batches:
+                await self._run_batch(claimed, leased, lease, collecting)
+            else:
+                await self._execute(claimed[0][1])
+            await self.queue.ack("tasks", [receipt for receipt, _ in claimed])
+        finally:
+            leased.difference_update(receipt for receipt, _ in claimed)
+
+    async def _execute(self, task: Task) -> None:
+        if self.stream is None:
+            raise RuntimeError("Must call connect() before running")
+
+        func = self._tasks[task.name]
+        if inspect.isasyncgenfunction(func):
+            await self._run_streaming(task)
+            return
+        started = time.time()
+        try:
+            async with asyncio.timeout(self._timeouts.get(task.name)):
+                result = await func(*task.args, **task.kwargs)
+        except Exception as exc:  # noqa: BLE001
+            trace = {**task.trace, "started": started, "finished": time.time()}
+            await self.stream.store(
+                "results", task.task_id, pack_result(None, trace, _error(exc))
+            )
+            self._export(task, {**trace, "stored": time.time()})
+            return
+        trace = {**task.trace, "started": started, "finished": time.time()}
+        if task.chain:
+            await self._forward(task, result)
+            self._export(task, trace)
+            return
+        await self.stream.store("results", task.task_id, pack_result(result, trace))
+        self._export(task, {**trace, "stored": time.time()})
+
+    async def _run_streaming(self, task: Task) -> None:
+        if self.stream is None:
+            raise RuntimeError("Must call connect() before running")
+
+        seq = 0
+        try:
+            async with asyncio.timeout(self._timeouts.get(task.name)):
+                async for chunk in self._tasks[task.name](*task.args, **task.kwargs):
+                    await self.stream.append("results", task.task_id, seq, chunk)
+                    seq += 1
+        except Exception as exc:  # noqa: BLE001
+            await self.stream.store("results", task.task_id, [seq, _error(exc)])
+            return
+        await self.stream.store("results", task.task_id, seq)
+
+    async def _forward(self, task: Task, result: Any) -> None:
+        if self.queue is None:
+            raise RuntimeError("Must call connect() before running")
+
+        await self.queue.push("tasks", _next_step(task, result), limit=False)
+
+    async def _run_batch(
+        self,
+        claimed: list[tuple[int, Task]],
+        leased: set[int],
+        lease: float,
+        collecting: dict[str, list[tuple[int, Task]]],
+    ) -> None:
+        if self.queue is None or self.stream is None:
+            raise RuntimeError("Must call connect() before running")
+
+        first = claimed[0][1]
+        max_size, max_wait = self._batches[first.name]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+
+        collecting[first.name] = claimed
+        try:
+            while len(claimed) < max_size:
+                for receipt, task in await self.queue.claim(
+                    "tasks", max_size - len(claimed), lease, first.name
+                ):
+                    leased.add(receipt)
+                    claimed.append((receipt, _popped(task)))
+                remaining = deadline - loop.time()
+                if len(claimed) >= max_size or remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, self.queue.polling_interval))
+        finally:
+            if collecting.get(first.name) is claimed:
+                del collecting[first.name]
+        if len(claimed) > max_size:
+            extra = [receipt for receipt, _ in claimed[max_size:]]
+            del claimed[max_size:]
+            leased.difference_update(extra)
+            await self.queue.renew("tasks", extra, 0.0)
+
+        batch = [task for _, task in claimed]
+        func = self._tasks[first.name]
+        started = time.time()
+        error = None
+        try:
+            async with asyncio.timeout(self._timeouts.get(first.name)):
+                results = await func([task.args[0] for task in batch])
+            _check_batch_results(first.name, results, len(batch))
+        except Exception as exc:  # noqa: BLE001
+            error = _error(exc)
+        finished = time.time()
+
+        traces = {
+            task.task_id: {**task.trace, "started": started, "finished": finished}
+            for task in batch
+        }
+        final = {}
+        if error is not None:
+            for task in batch:
+                final[task.task_id] = pack_result(None, traces[task.task_id], error)
+        else:
+            for task, result in zip(batch, results, strict=True):
+                if task.chain:
+                    await self._forward(task, result)
+                else:
+                    final[task.task_id] = pack_result(result, traces[task.task_id])
+        if final:
+            await self.stream.store_many("results", final)
+        stored = time.time()
+        for task in batch:
+            if task.task_id in final:
+                traces[task.task_id]["stored"] = stored
+            self._export(task, traces[task.task_id])
+
+    def _export(self, task: Task, trace: Trace) -> None:
+        if self.exporter is not None:
+            self.exporter.export(task.name, task.task_id, trace)
+
+
+def _next_step(task: Task, result: Any) -> Task:
+    step, *rest = task.chain
+    return Task(
+        task_id=task.task_id,
+        name=step.name,
+        args=(result, *step.args),
+        kwargs=step.kwargs,
+        chain=tuple(rest),
+        trace=new_trace(task.trace.get("trace_id")),
+    )
+
+
+def _check_batch_call(task: Task, batches: dict[str, tuple[int, float]]) -> None:
+    if task.name in batches and (len(task.args) != 1 or task.kwargs):
+        raise TypeError(f"Batch task {task.name} takes exactly one positional argument")
+
+
+def _check_batch_results(name: str, results: Any, size: int) -> None:
+    if not isinstance(results, list) or len(results) != size:
+        raise TypeError(f"Batch task {name} must return a list of {size} results")
+
+
+def _error(exc: BaseException) -> list[str]:
+    return [type(exc).__name__, str(exc)]
+
+
+def _delta(delay: float | timedelta) -> timedelta:
+    return delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+
+
+async def _sleep_until(run_at: float | None) -> None:
+    if run_at is not None:
+        await asyncio.sleep(max(0.0, run_at - time.time()))
+
+
+def _popped(task: Task) -> Task:
+    return replace(task, trace={**task.trace, "popped": time.time()})
+
+
+async def _open_backend(
+    dsn: str,
+    queue_durability: Durability,
+    stream_durability: Durability,
+    max_depth: int | None = None,
+    overflow: Overflow = "wait",
+) -> tuple[Queue, Stream]:
+    parsed = urlparse(dsn)
+
+    match parsed.scheme:
+        case "postgresql" | "postgres":
+            from .postgres.connection import create_connection_pool  # noqa: WPS433
+            from .postgres.queue import PostgresQueue  # noqa: WPS433
+            from .postgres.stream import PostgresStream  # noqa: WPS433
+
+            pool = await create_connection_pool(dsn)
+            return (
+                PostgresQueue(
+                    pool,
+                    max_depth=max_depth,
+                    overflow=overflow,
+                    durability=queue_durability,
+                ),
+                PostgresStream(pool, durability=stream_durability),
+            )
+        case "sqlite":
+            from .sqlite.queue import SqliteQueue  # noqa: WPS433
+            from .sqlite.stream import SqliteStream  # noqa: WPS433
+
+            filename = parsed.path
+            return (
+                SqliteQueue(
+                    filename,
+                    max_depth=max_depth,
+                    overflow=overflow,
+                    durability=queue_durability,
+                ),
+                SqliteStream(filename, durability=stream_durability),
+            )
+        case _:
+            raise ValueError(f"Unsupported DSN: {dsn}")
+
+
+def _shard_dsns(dsn: str, shards: int) -> list[str]:
+    prefix = "sqlite://"
+    if not dsn.startswith(prefix):
+        raise ValueError(f"Shard counts are only supported for SQLite DSNs: {dsn}")
+    root, ext = os.path.splitext(dsn.removeprefix(prefix))
+    return [f"{prefix}{root}.{index}{ext}" for index in range(shards)]
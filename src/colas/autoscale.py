@@ -0,0 +1,87 @@
+import asyncio
+import math
+import time
+
+__all__ = ["Autoscaler", "Slots"]
+
+
+class Slots:
+    def __init__(self, size: int):
+        self.size = size
+        self.used = 0
+        self._freed = asyncio.Event()
+
+    async def acquire(self) -> None:
+        while self.used >= self.size:
+            self._freed.clear()
+            await self._freed.wait()
+        self.used += 1
+
+    def release(self) -> None:
+        self.used -= 1
+        self._freed.set()
+
+    def resize(self, size: int) -> None:
+        self.size = size
+        self._freed.set()
+
+
+class Autoscaler:
+    def __init__(
+        self,
+        minimum: int = 1,
+        maximum: int = 32,
+        interval: float = 1.0,
+        target_wait: float = 1.0,
+        cooldown: float = 10.0,
+        smoothing: float = 0.2,
+    ):
+        if not 1 <= minimum <= maximum:
+            raise ValueError(f"Invalid concurrency range: {minimum}..{maximum}")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = interval
+        self.target_wait = target_wait
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.concurrency = minimum
+        self.latency: float | None = None
+        self.queue_wait: float | None = None
+        self._low_since: float | None = None
+
+    def _average(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def observe(self, latency: float, queue_wait: float | None = None) -> None:
+        self.latency = self._average(self.latency, latency)
+        if queue_wait is not None:
+            self.queue_wait = self._average(self.queue_wait, queue_wait)
+
+    def _desired(self, depth: int) -> int:
+        if depth <= 0:
+            return self.minimum
+        if self.latency is None:
+            desired = depth
+        else:
+            desired = math.ceil(depth * self.latency / self.target_wait)
+        if self.queue_wait is not None and self.queue_wait > self.target_wait:
+            desired = max(desired, self.concurrency * 2)
+        return max(self.minimum, min(self.maximum, desired))
+
+    def update(self, depth: int) -> int:
+        desired = self._desired(depth)
+        if desired > self.concurrency:
+            self.concurrency = desired
+            self._low_since = None
+        elif desired <= self.concurrency // 2:
+            now = time.monotonic()
+            if self._low_since is None:
+                self._low_since = now
+            if now - self._low_since >= self.cooldown:
+                self.concurrency = max(desired, self.concurrency // 2)
+                self._low_since = now
+        else:
+            self._low_since = None
+        return self.concurrency
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+from .task import Signature
+
+__all__ = ["Chain", "chain"]
+
+
+@dataclass
+class Chain:
+    steps: tuple[Signature, ...]
+
+
+def chain(*steps: Signature) -> Chain:
+    if not steps:
+        raise ValueError("A chain needs at least one step")
+    return Chain(steps=steps)
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+from dataclasses import asdict
+from typing import Any
+
+from .app import Colas
+
+__all__ = ["inspect", "main"]
+
+
+async def inspect(
+    dsn: str | list[str], shards: int = 1, sample: int = 10_000
+) -> dict[str, Any]:
+    app = Colas()
+    await app.connect(dsn, shards=shards)
+    try:
+        return await _stats(app, sample)
+    finally:
+        await app.close()
+
+
+async def _stats(app: Colas, sample: int) -> dict[str, Any]:
+    if app.queue is None or app.stream is None:
+        raise RuntimeError("Must call connect() before inspect()")
+
+    queue_stats, stream_stats = await asyncio.gather(
+        app.queue.stats("tasks", sample), app.stream.stats("results")
+    )
+    return {"queue": asdict(queue_stats), "stream": asdict(stream_stats)}
+
+
+def _age(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds:.1f}s"
+
+
+def _format(stats: dict[str, Any]) -> str:
+    queue, stream = stats["queue"], stats["stream"]
+    lines = [
+        f"queue   depth={queue['estimated_depth']} oldest={_age(queue['oldest_age'])}",
+        *(
+            f"  {name}: {count}"
+            for name, count in sorted(
+                queue["by_name"].items(), key=lambda item: (-item[1], item[0])
+            )
+        ),
+        (
+            f"stream  results={stream['results']} chunks={stream['chunks']} "
+            f"oldest={_age(stream['oldest_age'])}"
+        ),
+    ]
+    return "\n".join(lines)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    dsn = args.dsn[0] if len(args.dsn) == 1 else args.dsn
+    app = Colas()
+    await app.connect(dsn, shards=args.shards)
+    try:
+        while True:
+            stats = await _stats(app, args.sample)
+            print(json.dumps(stats) if args.json else _format(stats), flush=True)
+            if args.watch is None:
+                return
+            await asyncio.sleep(args.watch)
+    finally:
+        await app.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="colas")
+    commands = parser.add_subparsers(dest="command", required=True)
+    inspect_parser = commands.add_parser(
+        "inspect", help="show queue depth, task ages and stored results"
+    )
+    inspect_parser.add_argument("dsn", nargs="+")
+    inspect_parser.add_argument("--shards", type=int, default=1)
+    inspect_parser.add_argument("--sample", type=int, default=10_000)
+    inspect_parser.add_argument("--watch", type=float, metavar="SECONDS")
+    inspect_parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
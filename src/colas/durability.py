@@ -0,0 +1,5 @@
+from typing import Literal
+
+Durability = Literal["durable", "ephemeral"]
+
+__all__ = ["Durability"]
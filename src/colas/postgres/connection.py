@@ -1,9 +1,38 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import asyncpg  # type: ignore
 
-__all__ = ["create_connection_pool"]
+from ..durability import Durability
+
+__all__ = ["create_connection_pool", "table_options", "write_connection"]
+
+_EPHEMERAL_STORAGE = (
+    " WITH (fillfactor = 70, autovacuum_vacuum_scale_factor = 0.01,"
+    " autovacuum_vacuum_cost_delay = 0)"
+)
 
 
 async def create_connection_pool(dsn: str, **kwargs) -> asyncpg.Pool:
-    return await asyncpg.create_pool(dsn, **kwargs)
\ No newline at end of file
+    return await asyncpg.create_pool(dsn, **kwargs)
+
+
+def table_options(durability: Durability) -> tuple[str, str]:
+    if durability == "ephemeral":
+        return "UNLOGGED ", _EPHEMERAL_STORAGE
+    return "", ""
+
+
+@asynccontextmanager
+async def write_connection(
+    pool: asyncpg.Pool, durability: Durability
+) -> AsyncIterator[asyncpg.Connection]:
+    async with pool.acquire() as connection:
+        if durability == "durable":
+            yield connection
+            return
+        async with connection.transaction():
+            await connection.execute("SET LOCAL synchronous_commit = off")
+            yield connection
@@ -1,49 +1,101 @@
 from __future__ import annotations
 
+import json
+
 import asyncpg  # type: ignore
-import msgpack  # type: ignore
 
-from ..queue import Queue
-from ..task import Task
+from ..durability import Durability
+from ..queue import Overflow, Queue, QueueStats, task_age
+from ..task import Task, decode, encode
+from .connection import table_options, write_connection
 
 __all__ = ["PostgresQueue"]
 
+_EXACT_DEPTH = 1_000
+
+_COLUMNS = [
+    ("name", "TEXT NOT NULL DEFAULT ''"),
+    ("locked_until", "TIMESTAMPTZ"),
+    ("run_at", "TIMESTAMPTZ NOT NULL DEFAULT now()"),
+]
+
 
 class PostgresQueue(Queue):
-    def __init__(self, pool: asyncpg.Pool, polling_interval: float = 0.1):
-        super().__init__(polling_interval)
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        polling_interval: float = 0.1,
+        max_depth: int | None = None,
+        overflow: Overflow = "wait",
+        depth_refresh: float = 1.0,
+        durability: Durability = "durable",
+    ):
+        super().__init__(polling_interval, max_depth, overflow, depth_refresh)
         self._pool = pool
+        self.durability = durability
+
+    async def close(self) -> None:
+        await self._pool.close()
 
     async def init(self, queues: list[str]) -> None:
+        unlogged, storage = table_options(self.durability)
         async with self._pool.acquire() as connection:
             for queue in queues:
                 await connection.execute(
                     f"""
-                    CREATE TABLE IF NOT EXISTS {queue} (
+                    CREATE {unlogged}TABLE IF NOT EXISTS {queue} (
                         position BIGSERIAL PRIMARY KEY,
                         task_id UUID NOT NULL,
                         payload BYTEA NOT NULL
-                    )
+                    ){storage}
                 """
                 )
+                for column, definition in _COLUMNS:
+                    await connection.execute(
+                        f"ALTER TABLE {queue} ADD COLUMN IF NOT EXISTS "
+                        f"{column} {definition}"
+                    )
+                await connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {queue}_run_at_idx "
+                    f"ON {queue} (run_at, position)"
+                )
+                await connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {queue}_name_idx "
+                    f"ON {queue} (name, run_at, position)"
+                )
 
-    async def push(self, queue: str, task: Task) -> None:
-        payload = msgpack.packb((task.name, task.args, task.kwargs))
-        async with self._pool.acquire() as connection:
+    async def push(
+        self,
+        queue: str,
+        task: Task,
+        limit: bool = True,
+        run_at: float | None = None,
+    ) -> None:
+        if limit:
+            await self._reserve(queue)
+        payload = encode(task)
+        async with write_connection(self._pool, self.durability) as connection:
             await connection.execute(
-                f"INSERT INTO {queue} (task_id, payload) VALUES ($1, $2)",
+                f"""
+                INSERT INTO {queue} (task_id, name, payload, run_at)
+                VALUES ($1, $2, $3, COALESCE(to_timestamp($4), now()))
+                """,
                 task.task_id,
+                task.name,
                 payload,
+                run_at,
             )
 
     async def pop(self, queue: str) -> Task | None:
-        async with self._pool.acquire() as connection:
+        async with write_connection(self._pool, self.durability) as connection:
             row = await connection.fetchrow(
                 f"""
                 WITH oldest AS (
                     SELECT position, task_id, payload
                     FROM {queue}
-                    ORDER BY position ASC
+                    WHERE run_at <= now()
+                    AND (locked_until IS NULL OR locked_until < now())
+                    ORDER BY run_at ASC, position ASC
                     LIMIT 1
                     FOR UPDATE SKIP LOCKED
                 )
@@ -55,11 +107,124 @@ class PostgresQueue(Queue):
             if row is None:
                 return None
 
-            task_id, payload = row["task_id"], row["payload"]
-            name, args, kwargs = msgpack.unpackb(payload)
-            return Task(
-                task_id=task_id,
-                name=name,
-                args=tuple(args),
-                kwargs=kwargs,
+            return decode(row["task_id"], row["payload"])
+
+    async def claim(
+        self, queue: str, limit: int, lease: float, name: str | None = None
+    ) -> list[tuple[int, Task]]:
+        named = "" if name is None else "name = $3 AND "
+        async with write_connection(self._pool, self.durability) as connection:
+            rows = await connection.fetch(
+                f"""
+                WITH claimed AS (
+                    SELECT position
+                    FROM {queue}
+                    WHERE {named}run_at <= now()
+                    AND (locked_until IS NULL OR locked_until < now())
+                    ORDER BY run_at ASC, position ASC
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE {queue}
+                SET locked_until = now() + make_interval(secs => $2),
+                    run_at = now() + make_interval(secs => $2)
+                WHERE position IN (SELECT position FROM claimed)
+                RETURNING position, task_id, payload
+                """,
+                limit,
+                lease,
+                *(() if name is None else (name,)),
+            )
+            rows = sorted(rows, key=lambda row: row["position"])
+            return [
+                (row["position"], decode(row["task_id"], row["payload"]))
+                for row in rows
+            ]
+
+    async def renew(self, queue: str, receipts: list[int], lease: float) -> None:
+        if not receipts:
+            return
+
+        async with write_connection(self._pool, self.durability) as connection:
+            await connection.execute(
+                f"""
+                UPDATE {queue}
+                SET locked_until = now() + make_interval(secs => $2),
+                    run_at = now() + make_interval(secs => $2)
+                WHERE position = ANY($1)
+                """,
+                receipts,
+                lease,
+            )
+
+    async def ack(self, queue: str, receipts: list[int]) -> None:
+        if not receipts:
+            return
+
+        async with write_connection(self._pool, self.durability) as connection:
+            await connection.execute(
+                f"DELETE FROM {queue} WHERE position = ANY($1)",
+                receipts,
+            )
+
+    async def due_in(self, queue: str) -> float | None:
+        async with self._pool.acquire() as connection:
+            due_in = await connection.fetchval(
+                f"""
+                SELECT EXTRACT(EPOCH FROM run_at - now())
+                FROM {queue}
+                WHERE run_at > now()
+                ORDER BY run_at ASC
+                LIMIT 1
+                """
+            )
+        return None if due_in is None else float(due_in)
+
+    async def depth(self, queue: str) -> int:
+        async with self._pool.acquire() as connection:
+            depth = await connection.fetchval(
+                f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM {queue} WHERE run_at <= now() LIMIT $1
+                ) AS due
+                """,
+                _EXACT_DEPTH,
+            )
+            if depth < _EXACT_DEPTH:
+                return depth
+            plan = await connection.fetchval(
+                f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {queue} WHERE run_at <= now()"
+            )
+        return max(depth, int(json.loads(plan)[0]["Plan"]["Plan Rows"]))
+
+    async def stats(self, queue: str, sample: int = 10_000) -> QueueStats:
+        depth = await self.estimated_depth(queue)
+        async with self._pool.acquire() as connection:
+            oldest = await connection.fetchrow(
+                f"""
+                SELECT task_id, payload FROM {queue}
+                WHERE run_at <= now()
+                ORDER BY run_at ASC, position ASC
+                LIMIT 1
+                """
+            )
+            rows = await connection.fetch(
+                f"""
+                SELECT name, COUNT(*) AS count
+                FROM (
+                    SELECT name FROM {queue}
+                    WHERE run_at <= now()
+                    ORDER BY run_at ASC, position ASC
+                    LIMIT $1
+                ) AS head
+                GROUP BY name
+                """,
+                sample,
             )
+        return QueueStats(
+            estimated_depth=depth,
+            oldest_age=task_age(
+                decode(oldest["task_id"], oldest["payload"]) if oldest else None
+            ),
+            by_name={row["name"]: row["count"] for row in rows},
+        )
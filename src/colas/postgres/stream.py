@@ -1,53 +1,144 @@
-from datetime import datetime, timedelta, timezone
+from datetime import UTC, datetime, timedelta
 from typing import Any
 from uuid import UUID
 
 import asyncpg  # type: ignore[import-untyped]
 import msgpack  # type: ignore[import-untyped]
 
-from ..stream import Stream
+from ..durability import Durability
+from ..stream import Stream, StreamStats
+from .connection import table_options, write_connection
 
 __all__ = ["PostgresStream"]
 
 
 class PostgresStream(Stream):
-    def __init__(self, pool: asyncpg.Pool, polling_interval: float = 0.1):
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        polling_interval: float = 0.1,
+        durability: Durability = "durable",
+    ):
         super().__init__(polling_interval)
         self._pool = pool
+        self.durability = durability
+
+    async def close(self) -> None:
+        await self._pool.close()
 
     async def init(self, tables: list[str]) -> None:
+        unlogged, storage = table_options(self.durability)
         async with self._pool.acquire() as connection:
             for table in tables:
                 await connection.execute(
                     f"""
-                    CREATE TABLE IF NOT EXISTS {table} (
+                    CREATE {unlogged}TABLE IF NOT EXISTS {table} (
                         task_id UUID PRIMARY KEY,
                         payload BYTEA NOT NULL,
                         created_at TIMESTAMPTZ NOT NULL
-                    )
+                    ){storage}
+                    """
+                )
+                await connection.execute(
+                    f"""
+                    CREATE {unlogged}TABLE IF NOT EXISTS {table}_chunks (
+                        task_id UUID NOT NULL,
+                        seq INTEGER NOT NULL,
+                        payload BYTEA NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL,
+                        PRIMARY KEY (task_id, seq)
+                    ){storage}
                     """
                 )
+                for name in (table, f"{table}_chunks"):
+                    await connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name}_created_at_idx "
+                        f"ON {name} (created_at)"
+                    )
 
     async def store(self, table: str, task_id: UUID, result: Any) -> None:
         payload = msgpack.packb(result)
-        created_at = datetime.now(timezone.utc)
+        created_at = datetime.now(UTC)
 
-        async with self._pool.acquire() as connection:
+        async with write_connection(self._pool, self.durability) as connection:
             await connection.execute(
-                f"INSERT INTO {table} (task_id, payload, created_at) VALUES ($1, $2, $3)",
+                f"INSERT INTO {table} (task_id, payload, created_at) "
+                "VALUES ($1, $2, $3) ON CONFLICT DO NOTHING",
                 task_id,
                 payload,
                 created_at,
             )
 
-    async def clean(self, table: str, ttl: int) -> None:
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+    async def store_many(self, table: str, results: dict[UUID, Any]) -> None:
+        created_at = datetime.now(UTC)
+
+        async with write_connection(self._pool, self.durability) as connection:
+            await connection.executemany(
+                f"INSERT INTO {table} (task_id, payload, created_at) "
+                "VALUES ($1, $2, $3) ON CONFLICT DO NOTHING",
+                [
+                    (task_id, msgpack.packb(result), created_at)
+                    for task_id, result in results.items()
+                ],
+            )
+
+    async def append(self, table: str, task_id: UUID, seq: int, chunk: Any) -> None:
+        payload = msgpack.packb(chunk)
+        created_at = datetime.now(UTC)
+
+        async with write_connection(self._pool, self.durability) as connection:
+            await connection.execute(
+                f"INSERT INTO {table}_chunks (task_id, seq, payload, created_at) "
+                "VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING",
+                task_id,
+                seq,
+                payload,
+                created_at,
+            )
+
+    async def read(self, table: str, task_id: UUID, start: int) -> list[Any]:
+        async with self._pool.acquire() as connection:
+            rows = await connection.fetch(
+                f"SELECT payload FROM {table}_chunks "
+                "WHERE task_id = $1 AND seq >= $2 ORDER BY seq",
+                task_id,
+                start,
+            )
+            return [msgpack.unpackb(row["payload"]) for row in rows]
 
+    async def stats(self, table: str) -> StreamStats:
+        counts = []
         async with self._pool.acquire() as connection:
+            for name in (table, f"{table}_chunks"):
+                count = await connection.fetchval(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = to_regclass($1)",
+                    name,
+                )
+                if count is None or count < 0:
+                    count = await connection.fetchval(f"SELECT COUNT(*) FROM {name}")
+                counts.append(count)
+            oldest_age = await connection.fetchval(
+                f"SELECT EXTRACT(EPOCH FROM now() - MIN(created_at)) FROM {table}"
+            )
+        return StreamStats(
+            results=counts[0],
+            chunks=counts[1],
+            oldest_age=None if oldest_age is None else max(0.0, float(oldest_age)),
+        )
+
+    async def clean(self, table: str, ttl: int) -> None:
+        cutoff = datetime.now(UTC) - timedelta(seconds=ttl)
+
+        async with write_connection(self._pool, self.durability) as connection:
             await connection.execute(
                 f"DELETE FROM {table} WHERE created_at < $1",
                 cutoff,
             )
+            await connection.execute(
+                f"DELETE FROM {table}_chunks WHERE created_at < $1",
+                cutoff,
+            )
 
     async def retrieve(self, table: str, task_ids: list[UUID]) -> dict[UUID, Any]:
         if not task_ids:
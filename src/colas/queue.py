@@ -1,30 +1,132 @@
 import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+from typing import Literal
 
 from colas.task import Task
 
+Overflow = Literal["wait", "fail"]
+
+
+@dataclass(frozen=True, slots=True)
+class QueueStats:
+    estimated_depth: int
+    oldest_age: float | None
+    by_name: dict[str, int] = field(default_factory=dict)
+
+
+class QueueFull(Exception):
+    def __init__(self, queue: str, depth: int):
+        super().__init__(f"Queue {queue} is full ({depth} tasks)")
+        self.queue = queue
+        self.depth = depth
+
 
 class Queue(ABC):
-    def __init__(self, polling_interval: float = 0.1):
+    def __init__(
+        self,
+        polling_interval: float = 0.1,
+        max_depth: int | None = None,
+        overflow: Overflow = "wait",
+        depth_refresh: float = 1.0,
+    ):
         self.polling_interval = polling_interval
+        self.max_depth = max_depth
+        self.overflow = overflow
+        self.depth_refresh = depth_refresh
+        self._depths: dict[str, tuple[int, float]] = {}
+        self._due: dict[str, tuple[float | None, float]] = {}
 
     @abstractmethod
     async def init(self, queues: list[str]) -> None: ...
 
     @abstractmethod
-    async def push(self, queue: str, task: Task) -> None: ...
+    async def push(
+        self,
+        queue: str,
+        task: Task,
+        limit: bool = True,
+        run_at: float | None = None,
+    ) -> None: ...
 
     @abstractmethod
     async def pop(self, queue: str) -> Task | None: ...
 
-    async def tasks(self, queue: str) -> AsyncGenerator[Task, None]:
+    @abstractmethod
+    async def claim(
+        self, queue: str, limit: int, lease: float, name: str | None = None
+    ) -> list[tuple[int, Task]]: ...
+
+    @abstractmethod
+    async def renew(self, queue: str, receipts: list[int], lease: float) -> None: ...
+
+    @abstractmethod
+    async def ack(self, queue: str, receipts: list[int]) -> None: ...
+
+    @abstractmethod
+    async def due_in(self, queue: str) -> float | None: ...
+
+    @abstractmethod
+    async def depth(self, queue: str) -> int: ...
+
+    @abstractmethod
+    async def stats(self, queue: str, sample: int = 10_000) -> QueueStats: ...
+
+    async def close(self) -> None:
+        pass
+
+    async def tasks(self, queue: str) -> AsyncGenerator[Task]:
         while True:
             task = await self.pop(queue)
             if task:
                 yield task
             else:
-                await asyncio.sleep(self.polling_interval)
+                await asyncio.sleep(await self.poll_delay(queue))
+
+    async def poll_delay(self, queue: str) -> float:
+        cached = self._due.get(queue)
+        now = time.monotonic()
+        if (
+            cached is None
+            or now - cached[1] > self.depth_refresh
+            or (cached[0] is not None and cached[0] <= time.time())
+        ):
+            due_in = await self.due_in(queue)
+            cached = (None if due_in is None else time.time() + due_in, now)
+            self._due[queue] = cached
+        if cached[0] is None:
+            return self.polling_interval
+        return max(0.0, min(self.polling_interval, cached[0] - time.time()))
+
+    async def estimated_depth(self, queue: str, refresh: bool = False) -> int:
+        cached = self._depths.get(queue)
+        now = time.monotonic()
+        if refresh or cached is None or now - cached[1] > self.depth_refresh:
+            cached = (await self.depth(queue), now)
+            self._depths[queue] = cached
+        return cached[0]
+
+    async def _reserve(self, queue: str) -> None:
+        if self.max_depth is None:
+            return
+
+        backoff = self.polling_interval
+        depth = await self.estimated_depth(queue)
+        while depth >= self.max_depth:
+            if self.overflow == "fail":
+                raise QueueFull(queue, depth)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.depth_refresh)
+            depth = await self.estimated_depth(queue, refresh=True)
+        self._depths[queue] = (depth + 1, self._depths[queue][1])
+
+
+def task_age(task: Task | None) -> float | None:
+    if task is None or "enqueued" not in task.trace:
+        return None
+    return max(0.0, time.time() - task.trace["enqueued"])
 
 
-__all__: list[str] = ["Queue"]
+__all__: list[str] = ["Overflow", "Queue", "QueueFull", "QueueStats"]
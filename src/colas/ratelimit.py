@@ -0,0 +1,72 @@
+import asyncio
+import re
+import time
+
+__all__ = ["RateLimiter", "Throttle", "parse_rate"]
+
+_UNITS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_rate(rate: str) -> float:
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(?:/\s*([smh]))?\s*", rate)
+    if match is None:
+        raise ValueError(f"Invalid rate: {rate}")
+    amount, unit = match.groups()
+    return float(amount) / _UNITS[unit or "s"]
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float = 1.0):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    async def acquire(self) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.delay())
+
+
+class Throttle:
+    def __init__(
+        self, rate: RateLimiter | None = None, max_concurrency: int | None = None
+    ):
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.max_concurrency is not None and self.active >= self.max_concurrency:
+            return False
+        if self.rate is not None and not self.rate.try_acquire():
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+    def delay(self) -> float | None:
+        if self.max_concurrency is not None and self.active >= self.max_concurrency:
+            return None
+        if self.rate is not None:
+            return self.rate.delay()
+        return 0.0
@@ -0,0 +1,200 @@
+import asyncio
+import zlib
+from collections.abc import Callable
+from typing import Any
+from uuid import UUID
+
+from .queue import Overflow, Queue, QueueStats
+from .stream import Stream, StreamStats
+from .task import Task
+
+__all__ = ["ShardedQueue", "ShardedStream"]
+
+
+class ShardedQueue(Queue):
+    def __init__(
+        self,
+        shards: list[Queue],
+        route: Callable[[Task], str] | None = None,
+        polling_interval: float = 0.1,
+        max_depth: int | None = None,
+        overflow: Overflow = "wait",
+        depth_refresh: float = 1.0,
+    ):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        super().__init__(polling_interval, max_depth, overflow, depth_refresh)
+        self.shards = shards
+        self.route = route
+        self._next = 0
+
+    def _shard_index(self, task: Task) -> int:
+        if self.route is None:
+            return task.task_id.int % len(self.shards)
+        return zlib.crc32(self.route(task).encode()) % len(self.shards)
+
+    def _rotation(self) -> list[int]:
+        start = self._next
+        self._next = (start + 1) % len(self.shards)
+        return [
+            (start + offset) % len(self.shards) for offset in range(len(self.shards))
+        ]
+
+    async def init(self, queues: list[str]) -> None:
+        await asyncio.gather(*(shard.init(queues) for shard in self.shards))
+
+    async def push(
+        self,
+        queue: str,
+        task: Task,
+        limit: bool = True,
+        run_at: float | None = None,
+    ) -> None:
+        if limit:
+            await self._reserve(queue)
+        await self.shards[self._shard_index(task)].push(
+            queue, task, limit=False, run_at=run_at
+        )
+
+    async def pop(self, queue: str) -> Task | None:
+        for index in self._rotation():
+            task = await self.shards[index].pop(queue)
+            if task is not None:
+                return task
+        return None
+
+    async def claim(
+        self, queue: str, limit: int, lease: float, name: str | None = None
+    ) -> list[tuple[int, Task]]:
+        claimed: list[tuple[int, Task]] = []
+        for index in self._rotation():
+            if len(claimed) >= limit:
+                break
+            shard_claimed = await self.shards[index].claim(
+                queue, limit - len(claimed), lease, name
+            )
+            claimed += [
+                (receipt * len(self.shards) + index, task)
+                for receipt, task in shard_claimed
+            ]
+        return claimed
+
+    def _positions(self, receipts: list[int]) -> dict[int, list[int]]:
+        by_shard: dict[int, list[int]] = {}
+        for receipt in receipts:
+            position, index = divmod(receipt, len(self.shards))
+            by_shard.setdefault(index, []).append(position)
+        return by_shard
+
+    async def renew(self, queue: str, receipts: list[int], lease: float) -> None:
+        await asyncio.gather(
+            *(
+                self.shards[index].renew(queue, positions, lease)
+                for index, positions in self._positions(receipts).items()
+            )
+        )
+
+    async def ack(self, queue: str, receipts: list[int]) -> None:
+        await asyncio.gather(
+            *(
+                self.shards[index].ack(queue, positions)
+                for index, positions in self._positions(receipts).items()
+            )
+        )
+
+    async def close(self) -> None:
+        await asyncio.gather(*(shard.close() for shard in self.shards))
+
+    async def due_in(self, queue: str) -> float | None:
+        due = await asyncio.gather(*(shard.due_in(queue) for shard in self.shards))
+        return min((due_in for due_in in due if due_in is not None), default=None)
+
+    async def depth(self, queue: str) -> int:
+        depths = await asyncio.gather(*(shard.depth(queue) for shard in self.shards))
+        return sum(depths)
+
+    async def stats(self, queue: str, sample: int = 10_000) -> QueueStats:
+        shard_stats = await asyncio.gather(
+            *(shard.stats(queue, sample) for shard in self.shards)
+        )
+        by_name: dict[str, int] = {}
+        for stats in shard_stats:
+            for name, count in stats.by_name.items():
+                by_name[name] = by_name.get(name, 0) + count
+        ages = [
+            stats.oldest_age for stats in shard_stats if stats.oldest_age is not None
+        ]
+        return QueueStats(
+            estimated_depth=sum(stats.estimated_depth for stats in shard_stats),
+            oldest_age=max(ages, default=None),
+            by_name=by_name,
+        )
+
+
+class ShardedStream(Stream):
+    def __init__(self, shards: list[Stream], polling_interval: float = 0.1):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        super().__init__(polling_interval)
+        self.shards = shards
+
+    def _shard(self, task_id: UUID) -> Stream:
+        return self.shards[task_id.int % len(self.shards)]
+
+    def _group(self, task_ids: list[UUID]) -> dict[int, list[UUID]]:
+        by_shard: dict[int, list[UUID]] = {}
+        for task_id in task_ids:
+            by_shard.setdefault(task_id.int % len(self.shards), []).append(task_id)
+        return by_shard
+
+    async def init(self, tables: list[str]) -> None:
+        await asyncio.gather(*(shard.init(tables) for shard in self.shards))
+
+    async def store(self, table: str, task_id: UUID, result: Any) -> None:
+        await self._shard(task_id).store(table, task_id, result)
+
+    async def store_many(self, table: str, results: dict[UUID, Any]) -> None:
+        await asyncio.gather(
+            *(
+                self.shards[index].store_many(
+                    table, {task_id: results[task_id] for task_id in task_ids}
+                )
+                for index, task_ids in self._group(list(results)).items()
+            )
+        )
+
+    async def append(self, table: str, task_id: UUID, seq: int, chunk: Any) -> None:
+        await self._shard(task_id).append(table, task_id, seq, chunk)
+
+    async def read(self, table: str, task_id: UUID, start: int) -> list[Any]:
+        return await self._shard(task_id).read(table, task_id, start)
+
+    async def stats(self, table: str) -> StreamStats:
+        shard_stats = await asyncio.gather(
+            *(shard.stats(table) for shard in self.shards)
+        )
+        ages = [
+            stats.oldest_age for stats in shard_stats if stats.oldest_age is not None
+        ]
+        return StreamStats(
+            results=sum(stats.results for stats in shard_stats),
+            chunks=sum(stats.chunks for stats in shard_stats),
+            oldest_age=max(ages, default=None),
+        )
+
+    async def clean(self, table: str, ttl: int) -> None:
+        await asyncio.gather(*(shard.clean(table, ttl) for shard in self.shards))
+
+    async def close(self) -> None:
+        await asyncio.gather(*(shard.close() for shard in self.shards))
+
+    async def retrieve(self, table: str, task_ids: list[UUID]) -> dict[UUID, Any]:
+        results: dict[UUID, Any] = {}
+        for shard_results in await asyncio.gather(
+            *(
+                self.shards[index].retrieve(table, ids)
+                for index, ids in self._group(task_ids).items()
+            )
+        ):
+            results.update(shard_results)
+        return results
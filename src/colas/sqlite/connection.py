@@ -0,0 +1,27 @@
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import aiosqlite  # type: ignore
+
+from ..durability import Durability
+
+__all__ = ["connect", "database_file"]
+
+
+def database_file(filename: str, durability: Durability) -> str:
+    if durability == "durable" or filename == ":memory:":
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}.ephemeral{ext}"
+
+
+@asynccontextmanager
+async def connect(
+    filename: str, durability: Durability = "durable"
+) -> AsyncIterator[aiosqlite.Connection]:
+    async with aiosqlite.connect(filename) as db:
+        if durability == "ephemeral":
+            await db.execute("PRAGMA synchronous = OFF")
+            await db.execute("PRAGMA journal_mode = MEMORY")
+        yield db
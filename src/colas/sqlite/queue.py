@@ -1,21 +1,36 @@
+import time
 from uuid import UUID
 
-import aiosqlite  # type: ignore
-import msgpack  # type: ignore
-
-from ..queue import Queue
-from ..task import Task
+from ..durability import Durability
+from ..queue import Overflow, Queue, QueueStats, task_age
+from ..task import Task, decode, encode
+from .connection import connect, database_file
 
 __all__ = ["SqliteQueue"]
 
+_COLUMNS = [
+    ("name", "TEXT NOT NULL DEFAULT ''"),
+    ("locked_until", "REAL"),
+    ("run_at", "REAL NOT NULL DEFAULT 0"),
+]
+
 
 class SqliteQueue(Queue):
-    def __init__(self, filename: str, polling_interval: float = 0.1):
-        super().__init__(polling_interval)
-        self.filename = filename
+    def __init__(
+        self,
+        filename: str,
+        polling_interval: float = 0.1,
+        max_depth: int | None = None,
+        overflow: Overflow = "wait",
+        depth_refresh: float = 1.0,
+        durability: Durability = "durable",
+    ):
+        super().__init__(polling_interval, max_depth, overflow, depth_refresh)
+        self.filename = database_file(filename, durability)
+        self.durability = durability
 
     async def init(self, queues: list[str]) -> None:
-        async with aiosqlite.connect(self.filename) as db:
+        async with connect(self.filename, self.durability) as db:
             for queue in queues:
                 await db.execute(
                     f"""
@@ -26,44 +41,190 @@ class SqliteQueue(Queue):
                     )
                 """
                 )
+                async with db.execute(f"PRAGMA table_info({queue})") as cursor:
+                    existing = {row[1] for row in await cursor.fetchall()}
+                for column, definition in _COLUMNS:
+                    if column not in existing:
+                        await db.execute(
+                            f"ALTER TABLE {queue} ADD COLUMN {column} {definition}"
+                        )
+                await db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {queue}_run_at_idx "
+                    f"ON {queue} (run_at, position)"
+                )
+                await db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {queue}_name_idx "
+                    f"ON {queue} (name, run_at, position)"
+                )
             await db.commit()
 
-    async def push(self, queue: str, task: Task) -> None:
+    async def push(
+        self,
+        queue: str,
+        task: Task,
+        limit: bool = True,
+        run_at: float | None = None,
+    ) -> None:
+        if limit:
+            await self._reserve(queue)
         task_id_bytes = task.task_id.bytes
-        payload = msgpack.packb((task.name, task.args, task.kwargs))
+        payload = encode(task)
 
-        async with aiosqlite.connect(self.filename) as db:
+        async with connect(self.filename, self.durability) as db:
             await db.execute(
-                f"INSERT INTO {queue} (task_id, payload) VALUES (?, ?)",
-                (task_id_bytes, payload),
+                f"INSERT INTO {queue} (task_id, name, payload, run_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    task_id_bytes,
+                    task.name,
+                    payload,
+                    time.time() if run_at is None else run_at,
+                ),
             )
             await db.commit()
 
     async def pop(self, queue: str) -> Task | None:
-        async with aiosqlite.connect(self.filename) as db:
-            async with db.execute(
+        now = time.time()
+        async with (
+            connect(self.filename, self.durability) as db,
+            db.execute(
                 f"""
                 WITH oldest AS (
                     SELECT position, task_id, payload
                     FROM {queue}
-                    ORDER BY position ASC
+                    WHERE run_at <= ? AND (locked_until IS NULL OR locked_until < ?)
+                    ORDER BY run_at ASC, position ASC
                     LIMIT 1
                 )
                 DELETE FROM {queue}
                 WHERE position IN (SELECT position FROM oldest)
                 RETURNING task_id, payload
-                """
+                """,
+                (now, now),
+            ) as cursor,
+        ):
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            task_id_bytes, payload = row
+            return decode(UUID(bytes=task_id_bytes), payload)
+
+    async def claim(
+        self, queue: str, limit: int, lease: float, name: str | None = None
+    ) -> list[tuple[int, Task]]:
+        now = time.time()
+        named = "" if name is None else "name = ? AND "
+        async with connect(self.filename, self.durability) as db:
+            async with db.execute(
+                f"""
+                UPDATE {queue}
+                SET locked_until = ?, run_at = ?
+                WHERE position IN (
+                    SELECT position
+                    FROM {queue}
+                    WHERE {named}run_at <= ?
+                    AND (locked_until IS NULL OR locked_until < ?)
+                    ORDER BY run_at ASC, position ASC
+                    LIMIT ?
+                )
+                RETURNING position, task_id, payload
+                """,
+                (
+                    now + lease,
+                    now + lease,
+                    *(() if name is None else (name,)),
+                    now,
+                    now,
+                    limit,
+                ),
+            ) as cursor:
+                rows = await cursor.fetchall()
+            await db.commit()
+            return [
+                (position, decode(UUID(bytes=task_id_bytes), payload))
+                for position, task_id_bytes, payload in sorted(rows)
+            ]
+
+    async def renew(self, queue: str, receipts: list[int], lease: float) -> None:
+        if not receipts:
+            return
+
+        locked_until = time.time() + lease
+        placeholders = ", ".join("?" for _ in receipts)
+        async with connect(self.filename, self.durability) as db:
+            await db.execute(
+                f"UPDATE {queue} SET locked_until = ?, run_at = ? "
+                f"WHERE position IN ({placeholders})",
+                (locked_until, locked_until, *receipts),
+            )
+            await db.commit()
+
+    async def ack(self, queue: str, receipts: list[int]) -> None:
+        if not receipts:
+            return
+
+        placeholders = ", ".join("?" for _ in receipts)
+        async with connect(self.filename, self.durability) as db:
+            await db.execute(
+                f"DELETE FROM {queue} WHERE position IN ({placeholders})",
+                receipts,
+            )
+            await db.commit()
+
+    async def due_in(self, queue: str) -> float | None:
+        now = time.time()
+        async with (
+            connect(self.filename, self.durability) as db,
+            db.execute(
+                f"SELECT MIN(run_at) FROM {queue} WHERE run_at > ?", (now,)
+            ) as cursor,
+        ):
+            (run_at,) = await cursor.fetchone()
+        return None if run_at is None else run_at - now
+
+    async def depth(self, queue: str) -> int:
+        async with (
+            connect(self.filename, self.durability) as db,
+            db.execute(
+                f"SELECT COUNT(*) FROM {queue} WHERE run_at <= ?", (time.time(),)
+            ) as cursor,
+        ):
+            (depth,) = await cursor.fetchone()
+            return depth
+
+    async def stats(self, queue: str, sample: int = 10_000) -> QueueStats:
+        depth = await self.estimated_depth(queue)
+        now = time.time()
+        async with connect(self.filename, self.durability) as db:
+            async with db.execute(
+                f"""
+                SELECT task_id, payload FROM {queue}
+                WHERE run_at <= ?
+                ORDER BY run_at ASC, position ASC
+                LIMIT 1
+                """,
+                (now,),
             ) as cursor:
-                row = await cursor.fetchone()
-                if row is None:
-                    return None
-
-                task_id_bytes, payload = row
-                task_id = UUID(bytes=task_id_bytes)
-                name, args, kwargs = msgpack.unpackb(payload)
-                return Task(
-                    task_id=task_id,
-                    name=name,
-                    args=tuple(args),
-                    kwargs=kwargs,
+                oldest = await cursor.fetchone()
+            async with db.execute(
+                f"""
+                SELECT name, COUNT(*)
+                FROM (
+                    SELECT name FROM {queue}
+                    WHERE run_at <= ?
+                    ORDER BY run_at ASC, position ASC
+                    LIMIT ?
                 )
+                GROUP BY name
+                """,
+                (now, sample),
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return QueueStats(
+            estimated_depth=depth,
+            oldest_age=task_age(
+                decode(UUID(bytes=oldest[0]), oldest[1]) if oldest else None
+            ),
+            by_name=dict(rows),
+        )
@@ -1,22 +1,29 @@
-from datetime import datetime, timedelta, timezone
+from datetime import UTC, datetime, timedelta
 from typing import Any
 from uuid import UUID
 
-import aiosqlite  # type: ignore
 import msgpack  # type: ignore
 
-from ..stream import Stream
+from ..durability import Durability
+from ..stream import Stream, StreamStats
+from .connection import connect, database_file
 
 __all__ = ["SqliteStream"]
 
 
 class SqliteStream(Stream):
-    def __init__(self, filename: str, polling_interval: float = 0.1):
+    def __init__(
+        self,
+        filename: str,
+        polling_interval: float = 0.1,
+        durability: Durability = "durable",
+    ):
         super().__init__(polling_interval)
-        self.filename = filename
+        self.filename = database_file(filename, durability)
+        self.durability = durability
 
     async def init(self, tables: list[str]) -> None:
-        async with aiosqlite.connect(self.filename) as db:
+        async with connect(self.filename, self.durability) as db:
             for table in tables:
                 await db.execute(
                     f"""
@@ -27,28 +34,105 @@ class SqliteStream(Stream):
                     )
                     """
                 )
+                await db.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table}_chunks (
+                        task_id BLOB NOT NULL,
+                        seq INTEGER NOT NULL,
+                        payload BLOB NOT NULL,
+                        created_at TEXT NOT NULL,
+                        PRIMARY KEY (task_id, seq)
+                    )
+                    """
+                )
+                for name in (table, f"{table}_chunks"):
+                    await db.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name}_created_at_idx "
+                        f"ON {name} (created_at)"
+                    )
             await db.commit()
 
     async def store(self, table: str, task_id: UUID, result: Any) -> None:
         payload = msgpack.packb(result)
-        created_at = datetime.now(timezone.utc).isoformat()
+        created_at = datetime.now(UTC).isoformat()
 
-        async with aiosqlite.connect(self.filename) as db:
+        async with connect(self.filename, self.durability) as db:
             await db.execute(
-                f"INSERT INTO {table} (task_id, payload, created_at) VALUES (?, ?, ?)",
+                f"INSERT OR IGNORE INTO {table} (task_id, payload, created_at) "
+                "VALUES (?, ?, ?)",
                 (task_id.bytes, payload, created_at),
             )
             await db.commit()
 
+    async def store_many(self, table: str, results: dict[UUID, Any]) -> None:
+        created_at = datetime.now(UTC).isoformat()
+
+        async with connect(self.filename, self.durability) as db:
+            await db.executemany(
+                f"INSERT OR IGNORE INTO {table} (task_id, payload, created_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (task_id.bytes, msgpack.packb(result), created_at)
+                    for task_id, result in results.items()
+                ],
+            )
+            await db.commit()
+
+    async def append(self, table: str, task_id: UUID, seq: int, chunk: Any) -> None:
+        payload = msgpack.packb(chunk)
+        created_at = datetime.now(UTC).isoformat()
+
+        async with connect(self.filename, self.durability) as db:
+            await db.execute(
+                f"INSERT OR IGNORE INTO {table}_chunks "
+                "(task_id, seq, payload, created_at) VALUES (?, ?, ?, ?)",
+                (task_id.bytes, seq, payload, created_at),
+            )
+            await db.commit()
+
+    async def read(self, table: str, task_id: UUID, start: int) -> list[Any]:
+        async with (
+            connect(self.filename, self.durability) as db,
+            db.execute(
+                f"SELECT payload FROM {table}_chunks "
+                "WHERE task_id = ? AND seq >= ? ORDER BY seq",
+                (task_id.bytes, start),
+            ) as cursor,
+        ):
+            rows = await cursor.fetchall()
+            return [msgpack.unpackb(payload) for (payload,) in rows]
+
+    async def stats(self, table: str) -> StreamStats:
+        counts = []
+        async with connect(self.filename, self.durability) as db:
+            for name in (table, f"{table}_chunks"):
+                async with db.execute(
+                    f"SELECT COALESCE(MAX(rowid) - MIN(rowid) + 1, 0) FROM {name}"
+                ) as cursor:
+                    (count,) = await cursor.fetchone()
+                    counts.append(count)
+            async with db.execute(f"SELECT MIN(created_at) FROM {table}") as cursor:
+                (oldest,) = await cursor.fetchone()
+
+        oldest_age = None
+        if oldest is not None:
+            age = datetime.now(UTC) - datetime.fromisoformat(oldest)
+            oldest_age = max(0.0, age.total_seconds())
+        return StreamStats(results=counts[0], chunks=counts[1], oldest_age=oldest_age)
+
     async def clean(self, table: str, ttl: int) -> None:
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+        cutoff = datetime.now(UTC) - timedelta(seconds=ttl)
         cutoff_str = cutoff.isoformat()
 
-        async with aiosqlite.connect(self.filename) as db:
+        async with connect(self.filename, self.durability) as db:
             await db.execute(
                 f"DELETE FROM {table} WHERE created_at < ?",
                 (cutoff_str,),
             )
+            await db.execute(
+                f"DELETE FROM {table}_chunks WHERE created_at < ?",
+                (cutoff_str,),
+            )
             await db.commit()
 
     async def retrieve(self, table: str, task_ids: list[UUID]) -> dict[UUID, Any]:
@@ -58,13 +142,16 @@ class SqliteStream(Stream):
         task_id_bytes = [task_id.bytes for task_id in task_ids]
         placeholders = ", ".join("?" for _ in task_id_bytes)
 
-        async with aiosqlite.connect(self.filename) as db:
-            async with db.execute(
-                f"SELECT task_id, payload FROM {table} WHERE task_id IN ({placeholders})",
+        async with (
+            connect(self.filename, self.durability) as db,
+            db.execute(
+                f"SELECT task_id, payload FROM {table} "
+                f"WHERE task_id IN ({placeholders})",
                 task_id_bytes,
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return {
-                    UUID(bytes=task_id_bytes): msgpack.unpackb(payload)
-                    for task_id_bytes, payload in rows
-                }
+            ) as cursor,
+        ):
+            rows = await cursor.fetchall()
+            return {
+                UUID(bytes=task_id_bytes): msgpack.unpackb(payload)
+                for task_id_bytes, payload in rows
+            }
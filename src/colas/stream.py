@@ -1,9 +1,18 @@
 import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
 
 
+@dataclass(frozen=True, slots=True)
+class StreamStats:
+    results: int
+    chunks: int
+    oldest_age: float | None
+
+
 class Stream(ABC):
     def __init__(self, polling_interval: float = 0.1):
         self.polling_interval = polling_interval
@@ -14,18 +23,54 @@ class Stream(ABC):
     @abstractmethod
     async def store(self, table: str, task_id: UUID, result: Any) -> None: ...
 
+    @abstractmethod
+    async def store_many(self, table: str, results: dict[UUID, Any]) -> None: ...
+
+    @abstractmethod
+    async def append(self, table: str, task_id: UUID, seq: int, chunk: Any) -> None: ...
+
+    @abstractmethod
+    async def read(self, table: str, task_id: UUID, start: int) -> list[Any]: ...
+
+    @abstractmethod
+    async def stats(self, table: str) -> StreamStats: ...
+
     @abstractmethod
     async def clean(self, table: str, ttl: int) -> None: ...
 
-    async def wait(self, table: str, task_id: UUID) -> Any:
+    async def close(self) -> None:
+        pass
+
+    async def wait(
+        self, table: str, task_id: UUID, timeout: float | None = None
+    ) -> Any:
+        async with asyncio.timeout(timeout):
+            while True:
+                results = await self.retrieve(table, [task_id])
+                if task_id in results:
+                    return results[task_id]
+                await asyncio.sleep(self.polling_interval)
+
+    async def iterate(self, table: str, task_id: UUID) -> AsyncGenerator[Any]:
+        seq = 0
         while True:
+            chunks = await self.read(table, task_id, seq)
+            for chunk in chunks:
+                yield chunk
+            seq += len(chunks)
+            if chunks:
+                continue
+
             results = await self.retrieve(table, [task_id])
             if task_id in results:
-                return results[task_id]
+                final = results[task_id]
+                if seq >= (final if isinstance(final, int) else final[0]):
+                    return
+                continue
             await asyncio.sleep(self.polling_interval)
 
     @abstractmethod
     async def retrieve(self, table: str, task_ids: list[UUID]) -> dict[UUID, Any]: ...
 
 
-__all__: list[str] = ["Stream"]
+__all__: list[str] = ["Stream", "StreamStats"]
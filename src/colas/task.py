@@ -1,10 +1,95 @@
-from dataclasses import dataclass
+import struct
+from dataclasses import dataclass, field
+from typing import Any
 from uuid import UUID
 
+import msgpack  # type: ignore
 
-@dataclass
+__all__ = ["Signature", "Task", "decode", "encode", "pack_result", "unpack_result"]
+
+MAGIC = 0xC1
+VERSION = 2
+CODEC_MSGPACK = 1
+RESULT_EXT = 1
+
+_HEADER = struct.Struct("!BBBB")
+_PREFIX = _HEADER.pack(MAGIC, VERSION, CODEC_MSGPACK, 0)
+_pack = msgpack.Packer().pack
+
+
+@dataclass(frozen=True, slots=True)
+class Signature:
+    name: str
+    args: tuple
+    kwargs: dict
+
+
+@dataclass(frozen=True, slots=True)
 class Task:
     task_id: UUID
     name: str
     args: tuple
     kwargs: dict
+    chain: tuple[Signature, ...] = ()
+    trace: dict[str, Any] = field(default_factory=dict)
+
+
+def encode(task: Task) -> bytes:
+    chain = [(step.name, step.args, step.kwargs) for step in task.chain]
+    body = _pack((task.name, task.args, task.kwargs, chain, task.trace))
+    return _PREFIX + body
+
+
+def decode(task_id: UUID, payload: bytes) -> Task:
+    if payload[0] != MAGIC:
+        return _decode_legacy(task_id, payload)
+
+    _, version, codec, _ = _HEADER.unpack_from(payload)
+    if version != VERSION or codec != CODEC_MSGPACK:
+        raise ValueError(f"Unsupported task envelope: version {version}, codec {codec}")
+
+    name, args, kwargs, chain, trace = msgpack.unpackb(
+        memoryview(payload)[_HEADER.size :]
+    )
+    return Task(
+        task_id=task_id,
+        name=name,
+        args=tuple(args),
+        kwargs=kwargs,
+        chain=tuple(
+            Signature(name=step_name, args=tuple(step_args), kwargs=step_kwargs)
+            for step_name, step_args, step_kwargs in chain
+        ),
+        trace=trace,
+    )
+
+
+def _decode_legacy(task_id: UUID, payload: bytes) -> Task:
+    name, args, kwargs, *rest = msgpack.unpackb(payload)
+    chain = rest[0] if rest else []
+    trace = rest[1] if len(rest) > 1 else {}
+    return Task(
+        task_id=task_id,
+        name=name,
+        args=tuple(args),
+        kwargs=kwargs,
+        chain=tuple(
+            Signature(name=step_name, args=tuple(step_args), kwargs=step_kwargs)
+            for step_name, step_args, step_kwargs in chain
+        ),
+        trace=trace,
+    )
+
+
+def pack_result(
+    value: Any, trace: dict[str, Any], error: list[str] | None = None
+) -> msgpack.ExtType:
+    body = (value, trace) if error is None else (value, trace, error)
+    return msgpack.ExtType(RESULT_EXT, _pack(body))
+
+
+def unpack_result(payload: Any) -> tuple[Any, dict[str, Any], list[str] | None]:
+    if not isinstance(payload, msgpack.ExtType) or payload.code != RESULT_EXT:
+        return payload, {}, None
+    value, trace, *error = msgpack.unpackb(payload.data)
+    return value, trace, error[0] if error else None
@@ -0,0 +1,68 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid4
+
+__all__ = ["JsonLinesExporter", "SpanExporter", "Trace", "breakdown", "new_trace"]
+
+Trace = dict[str, Any]
+
+_STAGES = [
+    ("queue_wait", "enqueued", "popped"),
+    ("prefetch_wait", "popped", "started"),
+    ("execution", "started", "finished"),
+    ("store", "finished", "stored"),
+    ("pickup", "stored", "picked_up"),
+    ("delivery", "finished", "picked_up"),
+    ("total", "enqueued", "picked_up"),
+]
+
+
+def new_trace(trace_id: str | None = None) -> Trace:
+    return {"trace_id": trace_id or uuid4().hex, "enqueued": time.time()}
+
+
+def breakdown(trace: Trace) -> dict[str, float]:
+    return {
+        stage: trace[end] - trace[start]
+        for stage, start, end in _STAGES
+        if start in trace and end in trace
+    }
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, name: str, task_id: UUID, trace: Trace) -> None: ...
+
+    def flush(self) -> None:
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    def __init__(
+        self, path: str | Path, buffer_size: int = 1000, flush_interval: float = 1.0
+    ):
+        self.path = Path(path)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._lines: list[str] = []
+        self._flushed = time.monotonic()
+
+    def export(self, name: str, task_id: UUID, trace: Trace) -> None:
+        span = {"name": name, "task_id": str(task_id), **trace, **breakdown(trace)}
+        self._lines.append(json.dumps(span) + "\n")
+        if (
+            len(self._lines) >= self.buffer_size
+            or time.monotonic() - self._flushed >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._flushed = time.monotonic()
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        with self.path.open("a") as file:
+            file.writelines(lines)
@@ -1,4 +1,4 @@
-from typing import Iterator
+from collections.abc import Iterator
 
 import pytest
 from testcontainers.postgres import PostgresContainer  # type: ignore
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from colas.autoscale import Autoscaler, Slots
+
+
+def test_invalid_range():
+    with pytest.raises(ValueError, match="Invalid concurrency range"):
+        Autoscaler(minimum=4, maximum=2)
+
+
+def test_scales_up_with_depth():
+    scaler = Autoscaler(minimum=1, maximum=16)
+    assert scaler.update(0) == 1
+    assert scaler.update(4) == 4
+    assert scaler.update(100) == 16
+
+
+def test_scales_with_latency():
+    scaler = Autoscaler(minimum=1, maximum=64, target_wait=1.0)
+    scaler.observe(0.1)
+    assert scaler.update(50) == 5
+    scaler.observe(0.1, queue_wait=5.0)
+    assert scaler.update(50) == 10
+
+
+def test_scale_down_hysteresis():
+    scaler = Autoscaler(minimum=1, maximum=16, cooldown=3600)
+    scaler.update(16)
+    assert scaler.update(10) == 16
+    assert scaler.update(0) == 16
+
+    scaler.cooldown = 0
+    assert scaler.update(0) == 8
+    assert scaler.update(0) == 4
+    assert scaler.update(3) == 4
+
+
+@pytest.mark.asyncio
+async def test_slots_resize():
+    slots = Slots(1)
+    await slots.acquire()
+    waiter = asyncio.create_task(slots.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    slots.resize(2)
+    await asyncio.wait_for(waiter, 1)
+    assert slots.used == 2
+
+    slots.resize(1)
+    slots.release()
+    waiter = asyncio.create_task(slots.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    slots.release()
+    await asyncio.wait_for(waiter, 1)
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from colas import Colas, Task
+from colas.cli import main
+
+
+def test_inspect(temp_db_file, capsys):
+    app = Colas()
+
+    @app.task
+    async def add(a: int, b: int) -> int:
+        return a + b
+
+    async def enqueue():
+        await app.connect(f"sqlite://{temp_db_file}")
+        await app.init()
+        for i in range(3):
+            await app._push(
+                Task(task_id=uuid.uuid4(), name=add.name, args=(i, i), kwargs={})
+            )
+
+    asyncio.run(enqueue())
+
+    main(["inspect", f"sqlite://{temp_db_file}", "--json"])
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["queue"]["estimated_depth"] == 3
+    assert stats["queue"]["by_name"] == {add.name: 3}
+    assert stats["stream"] == {"results": 0, "chunks": 0, "oldest_age": None}
+
+    main(["inspect", f"sqlite://{temp_db_file}"])
+    assert f"{add.name}: 3" in capsys.readouterr().out
+
+
+def test_inspect_watch_reuses_connection(temp_db_file, capsys):
+    async def init():
+        app = Colas()
+        await app.connect(f"sqlite://{temp_db_file}")
+        await app.init()
+
+    asyncio.run(init())
+    sleeps = []
+    connect, close = Colas.connect, Colas.close
+    calls = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 3:
+            raise RuntimeError("stop")
+
+    async def counted_connect(self, *args, **kwargs):
+        calls.append("connect")
+        await connect(self, *args, **kwargs)
+
+    async def counted_close(self):
+        calls.append("close")
+        await close(self)
+
+    with (
+        patch("colas.cli.asyncio.sleep", sleep),
+        patch.object(Colas, "connect", counted_connect),
+        patch.object(Colas, "close", counted_close),
+        pytest.raises(RuntimeError, match="stop"),
+    ):
+        main(["inspect", f"sqlite://{temp_db_file}", "--watch", "1"])
+
+    assert sleeps == [1.0, 1.0, 1.0]
+    assert calls == ["connect", "close"]
+    assert capsys.readouterr().out.count("queue   depth=0") == 3
@@ -1,17 +1,21 @@
 import asyncio
 import threading
+import time
 import uuid
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
+import aiosqlite  # type: ignore
+import msgpack  # type: ignore
 import pytest
 import pytest_asyncio
 from testcontainers.postgres import PostgresContainer  # type: ignore
 
+from colas.durability import Durability
 from colas.postgres.queue import PostgresQueue
-from colas.queue import Queue
+from colas.queue import Queue, QueueFull
 from colas.sqlite.queue import SqliteQueue
-from colas.task import Task
+from colas.task import Signature, Task
 
 
 @pytest_asyncio.fixture
@@ -26,8 +30,8 @@ async def postgres_queue(postgres_queue_factory) -> PostgresQueue:
 
 @pytest.fixture
 def sqlite_queue_factory(temp_db_file: Path):
-    async def factory() -> SqliteQueue:
-        return SqliteQueue(str(temp_db_file))
+    async def factory(durability: Durability = "durable") -> SqliteQueue:
+        return SqliteQueue(str(temp_db_file), durability=durability)
 
     return factory
 
@@ -36,11 +40,11 @@ def sqlite_queue_factory(temp_db_file: Path):
 def postgres_queue_factory(postgres_container: PostgresContainer):
     dsn = postgres_container.get_connection_url(driver=None)
 
-    async def factory() -> PostgresQueue:
+    async def factory(durability: Durability = "durable") -> PostgresQueue:
         from colas.postgres.connection import create_connection_pool
 
         pool = await create_connection_pool(dsn)
-        return PostgresQueue(pool)
+        return PostgresQueue(pool, durability=durability)
 
     return factory
 
@@ -87,6 +91,34 @@ async def test_push_and_pop(implementation: Queue):
     assert await queue_impl.pop("test_queue") is None
 
 
+@pytest.mark.asyncio
+async def test_ephemeral_queue(implementation_factory):
+    queue_impl = await implementation_factory(durability="ephemeral")
+    await queue_impl.init(["test_queue"])
+
+    task = Task(task_id=uuid.uuid4(), name="task", args=(1,), kwargs={"a": 2})
+    await queue_impl.push("test_queue", task)
+    assert await queue_impl.pop("test_queue") == task
+
+    await queue_impl.push("test_queue", task)
+    claimed = await queue_impl.claim("test_queue", 1, lease=60)
+    assert [claimed_task for _, claimed_task in claimed] == [task]
+    await queue_impl.ack("test_queue", [receipt for receipt, _ in claimed])
+    assert await queue_impl.depth("test_queue") == 0
+
+
+@pytest.mark.asyncio
+async def test_ephemeral_postgres_queue_is_unlogged(postgres_queue_factory):
+    queue_impl = await postgres_queue_factory(durability="ephemeral")
+    await queue_impl.init(["test_queue"])
+
+    async with queue_impl._pool.acquire() as connection:
+        persistence = await connection.fetchval(
+            "SELECT relpersistence::text FROM pg_class WHERE relname = 'test_queue'"
+        )
+    assert persistence == "u"
+
+
 @pytest.mark.asyncio
 async def test_pop_from_empty_queue(implementation: Queue):
     queue_impl = implementation
@@ -95,6 +127,365 @@ async def test_pop_from_empty_queue(implementation: Queue):
     assert await queue_impl.pop("test_queue") is None
 
 
+@pytest.mark.asyncio
+async def test_push_and_pop_chain(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    task = Task(
+        task_id=uuid.uuid4(),
+        name="first",
+        args=(1,),
+        kwargs={},
+        chain=(
+            Signature(name="second", args=(2,), kwargs={}),
+            Signature(name="third", args=(), kwargs={"c": 3}),
+        ),
+    )
+    await queue_impl.push("test_queue", task)
+
+    popped_task = await queue_impl.pop("test_queue")
+    assert popped_task == task
+
+
+@pytest.mark.asyncio
+async def test_claim_and_ack(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    tasks = [
+        Task(task_id=uuid.uuid4(), name=str(i), args=(i,), kwargs={}) for i in range(3)
+    ]
+    for task in tasks:
+        await queue_impl.push("test_queue", task)
+
+    claimed = await queue_impl.claim("test_queue", 2, lease=60)
+    assert [task.task_id for _, task in claimed] == [
+        tasks[0].task_id,
+        tasks[1].task_id,
+    ]
+
+    claimed_rest = await queue_impl.claim("test_queue", 10, lease=60)
+    assert [task.task_id for _, task in claimed_rest] == [tasks[2].task_id]
+    assert await queue_impl.claim("test_queue", 10, lease=60) == []
+    assert await queue_impl.pop("test_queue") is None
+
+    await queue_impl.ack("test_queue", [receipt for receipt, _ in claimed])
+    await queue_impl.ack("test_queue", [])
+    assert await queue_impl.depth("test_queue") == 0
+    assert 0 < await queue_impl.due_in("test_queue") <= 60
+
+    await queue_impl.ack("test_queue", [receipt for receipt, _ in claimed_rest])
+    assert await queue_impl.due_in("test_queue") is None
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_visible_again(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    task = Task(task_id=uuid.uuid4(), name="task", args=(), kwargs={})
+    await queue_impl.push("test_queue", task)
+
+    claimed = await queue_impl.claim("test_queue", 1, lease=0.05)
+    assert len(claimed) == 1
+    assert await queue_impl.claim("test_queue", 1, lease=0.05) == []
+
+    await asyncio.sleep(0.1)
+    reclaimed = await queue_impl.claim("test_queue", 1, lease=60)
+    assert [task.task_id for _, task in reclaimed] == [task.task_id]
+
+
+@pytest.mark.asyncio
+async def test_claim_by_name(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    for i in range(4):
+        name = "batch" if i % 2 else "other"
+        task = Task(task_id=uuid.uuid4(), name=name, args=(i,), kwargs={})
+        await queue_impl.push("test_queue", task)
+
+    claimed = await queue_impl.claim("test_queue", 10, lease=60, name="batch")
+    assert [task.args for _, task in claimed] == [(1,), (3,)]
+    rest = await queue_impl.claim("test_queue", 10, lease=60)
+    assert [task.args for _, task in rest] == [(0,), (2,)]
+
+
+@pytest.mark.asyncio
+async def test_renewed_lease_stays_hidden(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    task = Task(task_id=uuid.uuid4(), name="task", args=(), kwargs={})
+    await queue_impl.push("test_queue", task)
+
+    claimed = await queue_impl.claim("test_queue", 1, lease=0.1)
+    for _ in range(3):
+        await asyncio.sleep(0.05)
+        await queue_impl.renew("test_queue", [receipt for receipt, _ in claimed], 0.1)
+    assert await queue_impl.claim("test_queue", 1, lease=60) == []
+    await queue_impl.renew("test_queue", [], 0.1)
+
+    await asyncio.sleep(0.15)
+    reclaimed = await queue_impl.claim("test_queue", 1, lease=60)
+    assert [task.task_id for _, task in reclaimed] == [task.task_id]
+
+
+@pytest.mark.asyncio
+async def test_scheduled_tasks(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+    assert await queue_impl.due_in("test_queue") is None
+
+    later = Task(task_id=uuid.uuid4(), name="later", args=(), kwargs={})
+    soon = Task(task_id=uuid.uuid4(), name="soon", args=(), kwargs={})
+    now = Task(task_id=uuid.uuid4(), name="now", args=(), kwargs={})
+    await queue_impl.push("test_queue", later, run_at=time.time() + 3600)
+    await queue_impl.push("test_queue", soon, run_at=time.time() + 0.2)
+    await queue_impl.push("test_queue", now)
+
+    assert 0 < await queue_impl.due_in("test_queue") <= 0.2
+    assert 0 < await queue_impl.poll_delay("test_queue") <= 0.1
+    assert (await queue_impl.pop("test_queue")).task_id == now.task_id
+    assert await queue_impl.claim("test_queue", 10, lease=60) == []
+    assert await queue_impl.claim("test_queue", 10, lease=60, name="soon") == []
+
+    await asyncio.sleep(0.3)
+    assert (await queue_impl.pop("test_queue")).task_id == soon.task_id
+    assert await queue_impl.pop("test_queue") is None
+    assert 3500 < await queue_impl.due_in("test_queue") <= 3600
+
+
+@pytest.mark.asyncio
+async def test_poll_delay_caches_next_due(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    task = Task(task_id=uuid.uuid4(), name="soon", args=(), kwargs={})
+    await queue_impl.push("test_queue", task, run_at=time.time() + 0.05)
+    with patch.object(queue_impl, "due_in", wraps=queue_impl.due_in) as due_in:
+        for _ in range(5):
+            assert 0 <= await queue_impl.poll_delay("test_queue") <= 0.05
+        assert due_in.await_count == 1
+
+        await asyncio.sleep(0.1)
+        assert await queue_impl.poll_delay("test_queue") == 0.1
+        assert await queue_impl.poll_delay("test_queue") == 0.1
+        assert due_in.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_depth(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+    assert await queue_impl.depth("test_queue") == 0
+
+    for i in range(3):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+    assert await queue_impl.depth("test_queue") == 3
+
+    await queue_impl.pop("test_queue")
+    assert await queue_impl.depth("test_queue") == 2
+
+
+@pytest.mark.asyncio
+async def test_depth_counts_only_due_unleased_tasks(implementation: Queue):
+    queue_impl = implementation
+    queue_impl.max_depth = 3
+    queue_impl.overflow = "fail"
+    queue_impl.depth_refresh = 0
+    await queue_impl.init(["test_queue"])
+
+    later = Task(task_id=uuid.uuid4(), name="later", args=(), kwargs={})
+    await queue_impl.push("test_queue", later, run_at=time.time() + 3600)
+    for i in range(20):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+        assert await queue_impl.pop("test_queue") == task
+    assert await queue_impl.depth("test_queue") == 0
+
+    for i in range(2):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+    await queue_impl.claim("test_queue", 1, lease=60)
+    assert await queue_impl.depth("test_queue") == 1
+    assert (await queue_impl.stats("test_queue")).estimated_depth == 1
+
+
+@pytest.mark.asyncio
+async def test_stats(implementation: Queue):
+    queue_impl = implementation
+    queue_impl.depth_refresh = 0
+    await queue_impl.init(["test_queue"])
+    stats = await queue_impl.stats("test_queue")
+    assert (stats.estimated_depth, stats.oldest_age, stats.by_name) == (0, None, {})
+
+    later = Task(
+        task_id=uuid.uuid4(),
+        name="later",
+        args=(),
+        kwargs={},
+        trace={"enqueued": time.time() - 600},
+    )
+    await queue_impl.push("test_queue", later, run_at=time.time() + 3600)
+    for name in ["a", "b", "a"]:
+        task = Task(
+            task_id=uuid.uuid4(),
+            name=name,
+            args=(),
+            kwargs={},
+            trace={"enqueued": time.time() - 5},
+        )
+        await queue_impl.push("test_queue", task)
+
+    stats = await queue_impl.stats("test_queue")
+    assert stats.estimated_depth == 3
+    assert stats.by_name == {"a": 2, "b": 1}
+    assert 5 <= stats.oldest_age < 60
+    assert (await queue_impl.stats("test_queue", sample=1)).by_name == {"a": 1}
+
+
+@pytest.mark.asyncio
+async def test_stats_reuse_cached_depth(implementation: Queue):
+    queue_impl = implementation
+    await queue_impl.init(["test_queue"])
+
+    for i in range(2):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+        assert (await queue_impl.stats("test_queue")).estimated_depth == 1
+
+    queue_impl.depth_refresh = 0
+    assert (await queue_impl.stats("test_queue")).estimated_depth == 2
+
+
+@pytest.mark.asyncio
+async def test_postgres_depth_estimate(postgres_queue: PostgresQueue):
+    queue_impl = postgres_queue
+    await queue_impl.init(["test_queue"])
+    for i in range(20):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+    async with queue_impl._pool.acquire() as connection:
+        await connection.execute("ANALYZE test_queue")
+
+    with patch("colas.postgres.queue._EXACT_DEPTH", 5):
+        assert 5 <= await queue_impl.depth("test_queue") <= 40
+
+
+@pytest.mark.asyncio
+async def test_max_depth_fail(implementation: Queue):
+    queue_impl = implementation
+    queue_impl.max_depth = 2
+    queue_impl.overflow = "fail"
+    await queue_impl.init(["test_queue"])
+
+    for i in range(2):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await queue_impl.push("test_queue", task)
+
+    task = Task(task_id=uuid.uuid4(), name="overflow", args=(), kwargs={})
+    with pytest.raises(QueueFull) as excinfo:
+        await queue_impl.push("test_queue", task)
+    assert excinfo.value.queue == "test_queue"
+    assert excinfo.value.depth == 2
+
+
+@pytest.mark.asyncio
+async def test_max_depth_wait(implementation: Queue):
+    queue_impl = implementation
+    queue_impl.max_depth = 1
+    queue_impl.polling_interval = 0.01
+    await queue_impl.init(["test_queue"])
+
+    first = Task(task_id=uuid.uuid4(), name="first", args=(), kwargs={})
+    await queue_impl.push("test_queue", first)
+
+    second = Task(task_id=uuid.uuid4(), name="second", args=(), kwargs={})
+    push = asyncio.create_task(queue_impl.push("test_queue", second))
+    await asyncio.sleep(0.05)
+    assert not push.done()
+
+    popped = await queue_impl.pop("test_queue")
+    assert popped is not None
+    assert popped.task_id == first.task_id
+    await asyncio.wait_for(push, timeout=1)
+
+    popped = await queue_impl.pop("test_queue")
+    assert popped is not None
+    assert popped.task_id == second.task_id
+
+
+@pytest.mark.asyncio
+async def test_sqlite_migrates_baseline_table(temp_db_file):
+    legacy_id = uuid.uuid4()
+    async with aiosqlite.connect(temp_db_file) as db:
+        await db.execute(
+            """
+            CREATE TABLE test_queue (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id BLOB NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        await db.execute(
+            "INSERT INTO test_queue (task_id, payload) VALUES (?, ?)",
+            (legacy_id.bytes, msgpack.packb(("legacy", [1], {}))),
+        )
+        await db.commit()
+
+    queue_impl = SqliteQueue(str(temp_db_file))
+    await queue_impl.init(["test_queue"])
+    async with aiosqlite.connect(temp_db_file) as db:
+        await db.execute(
+            "INSERT INTO test_queue (task_id, payload) VALUES (?, ?)",
+            (uuid.uuid4().bytes, msgpack.packb(("old_producer", [], {}))),
+        )
+        await db.commit()
+    task = Task(task_id=uuid.uuid4(), name="new", args=(), kwargs={})
+    await queue_impl.push("test_queue", task)
+
+    popped = [await queue_impl.pop("test_queue") for _ in range(3)]
+    assert [task.name for task in popped] == ["legacy", "old_producer", "new"]
+    assert popped[0].task_id == legacy_id
+
+
+@pytest.mark.asyncio
+async def test_postgres_migrates_baseline_table(postgres_queue_factory):
+    queue_impl = await postgres_queue_factory()
+    async with queue_impl._pool.acquire() as connection:
+        await connection.execute(
+            """
+            CREATE TABLE test_queue (
+                position BIGSERIAL PRIMARY KEY,
+                task_id UUID NOT NULL,
+                payload BYTEA NOT NULL
+            )
+            """
+        )
+        await connection.execute(
+            "INSERT INTO test_queue (task_id, payload) VALUES ($1, $2)",
+            uuid.uuid4(),
+            msgpack.packb(("legacy", [1], {})),
+        )
+
+    await queue_impl.init(["test_queue"])
+    async with queue_impl._pool.acquire() as connection:
+        await connection.execute(
+            "INSERT INTO test_queue (task_id, payload) VALUES ($1, $2)",
+            uuid.uuid4(),
+            msgpack.packb(("old_producer", [], {})),
+        )
+    task = Task(task_id=uuid.uuid4(), name="new", args=(), kwargs={})
+    await queue_impl.push("test_queue", task)
+
+    popped = [await queue_impl.pop("test_queue") for _ in range(3)]
+    assert [task.name for task in popped] == ["legacy", "old_producer", "new"]
+
+
 @pytest.mark.asyncio
 async def test_queue_isolation(temp_db_file):
     db_file = str(temp_db_file)
@@ -0,0 +1,52 @@
+import pytest
+
+from colas.ratelimit import RateLimiter, Throttle, parse_rate
+
+
+@pytest.mark.parametrize(
+    "rate, expected",
+    [("100/s", 100.0), ("60/m", 1.0), ("7200/h", 2.0), ("5", 5.0), ("0.5/s", 0.5)],
+)
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+
+@pytest.mark.parametrize("rate", ["", "fast", "10/d", "/s"])
+def test_parse_rate_invalid(rate):
+    with pytest.raises(ValueError, match="Invalid rate"):
+        parse_rate(rate)
+
+
+def test_rate_limiter_burst():
+    limiter = RateLimiter(rate=1.0, burst=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert 0 < limiter.delay() <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_acquire_waits():
+    limiter = RateLimiter(rate=100.0)
+    await limiter.acquire()
+    assert limiter.delay() > 0
+    await limiter.acquire()
+    assert not limiter.try_acquire()
+
+
+def test_throttle_max_concurrency():
+    throttle = Throttle(max_concurrency=1)
+    assert throttle.try_acquire()
+    assert not throttle.try_acquire()
+    assert throttle.delay() is None
+    throttle.release()
+    assert throttle.delay() == 0.0
+    assert throttle.try_acquire()
+
+
+def test_throttle_rate():
+    throttle = Throttle(rate=RateLimiter(rate=1.0))
+    assert throttle.try_acquire()
+    assert not throttle.try_acquire()
+    assert throttle.active == 1
+    assert 0 < throttle.delay() <= 1.0
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from colas.sharding import ShardedQueue, ShardedStream
+from colas.sqlite.queue import SqliteQueue
+from colas.sqlite.stream import SqliteStream
+from colas.task import Task
+
+
+@pytest_asyncio.fixture
+async def sharded_queue(tmp_path: Path) -> ShardedQueue:
+    queue = ShardedQueue([SqliteQueue(str(tmp_path / f"{i}.db")) for i in range(3)])
+    await queue.init(["test_queue"])
+    return queue
+
+
+@pytest_asyncio.fixture
+async def sharded_stream(tmp_path: Path) -> ShardedStream:
+    stream = ShardedStream([SqliteStream(str(tmp_path / f"{i}.db")) for i in range(3)])
+    await stream.init(["test_stream"])
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_push_distributes_and_pop_drains(sharded_queue: ShardedQueue):
+    tasks = [
+        Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={}) for i in range(30)
+    ]
+    for task in tasks:
+        await sharded_queue.push("test_queue", task)
+
+    depths = [await shard.depth("test_queue") for shard in sharded_queue.shards]
+    assert sum(depths) == 30
+    assert all(depth > 0 for depth in depths)
+    assert await sharded_queue.depth("test_queue") == 30
+
+    popped = []
+    while (task := await sharded_queue.pop("test_queue")) is not None:
+        popped.append(task.task_id)
+    assert sorted(popped) == sorted(task.task_id for task in tasks)
+
+
+@pytest.mark.asyncio
+async def test_stats_merge_shards(
+    sharded_queue: ShardedQueue, sharded_stream: ShardedStream
+):
+    for i in range(30):
+        task = Task(
+            task_id=uuid.uuid4(),
+            name="even" if i % 2 == 0 else "odd",
+            args=(),
+            kwargs={},
+            trace={"enqueued": time.time() - 30 + i},
+        )
+        await sharded_queue.push("test_queue", task)
+        await sharded_stream.store("test_stream", task.task_id, i)
+
+    queue_stats = await sharded_queue.stats("test_queue")
+    assert queue_stats.estimated_depth == 30
+    assert queue_stats.by_name == {"even": 15, "odd": 15}
+    assert 30 <= queue_stats.oldest_age < 60
+
+    stream_stats = await sharded_stream.stats("test_stream")
+    assert (stream_stats.results, stream_stats.chunks) == (30, 0)
+
+
+@pytest.mark.asyncio
+async def test_route(tmp_path: Path):
+    queue = ShardedQueue(
+        [SqliteQueue(str(tmp_path / f"{i}.db")) for i in range(3)],
+        route=lambda task: task.name,
+    )
+    await queue.init(["test_queue"])
+
+    for _ in range(5):
+        task = Task(task_id=uuid.uuid4(), name="same", args=(), kwargs={})
+        await queue.push("test_queue", task)
+
+    depths = [await shard.depth("test_queue") for shard in queue.shards]
+    assert sorted(depths) == [0, 0, 5]
+
+
+@pytest.mark.asyncio
+async def test_claim_and_ack_across_shards(sharded_queue: ShardedQueue):
+    for i in range(6):
+        task = Task(task_id=uuid.uuid4(), name=str(i), args=(), kwargs={})
+        await sharded_queue.push("test_queue", task)
+
+    claimed = await sharded_queue.claim("test_queue", 10, lease=60)
+    assert len(claimed) == 6
+    assert await sharded_queue.claim("test_queue", 10, lease=60) == []
+
+    receipts = [receipt for receipt, _ in claimed]
+    await sharded_queue.renew("test_queue", receipts, 0.05)
+    await asyncio.sleep(0.1)
+    assert len(await sharded_queue.claim("test_queue", 10, lease=60)) == 6
+
+    await sharded_queue.ack("test_queue", receipts)
+    assert await sharded_queue.depth("test_queue") == 0
+    assert await sharded_queue.due_in("test_queue") is None
+
+
+@pytest.mark.asyncio
+async def test_claim_by_name_across_shards(sharded_queue: ShardedQueue):
+    for i in range(6):
+        task = Task(task_id=uuid.uuid4(), name="batch", args=(i,), kwargs={})
+        await sharded_queue.push("test_queue", task)
+    other = Task(task_id=uuid.uuid4(), name="other", args=(), kwargs={})
+    await sharded_queue.push("test_queue", other)
+
+    batch = await sharded_queue.claim("test_queue", 4, lease=60, name="batch")
+    assert len(batch) == 4
+    batch += await sharded_queue.claim("test_queue", 4, lease=60, name="batch")
+    assert sorted(task.args[0] for _, task in batch) == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_stream_routes_by_task_id(sharded_stream: ShardedStream):
+    results = {uuid.uuid4(): i for i in range(10)}
+    task_ids = list(results)
+    await sharded_stream.store("test_stream", task_ids[0], 0)
+    await sharded_stream.store_many(
+        "test_stream", {task_id: results[task_id] for task_id in task_ids[1:]}
+    )
+
+    assert await sharded_stream.retrieve("test_stream", task_ids) == results
+    for task_id in task_ids:
+        shard = sharded_stream.shards[task_id.int % 3]
+        assert await shard.retrieve("test_stream", [task_id]) == {
+            task_id: results[task_id]
+        }
+
+    await sharded_stream.append("test_stream", task_ids[0], 0, "chunk")
+    assert await sharded_stream.read("test_stream", task_ids[0], 0) == ["chunk"]
+
+
+def test_empty_shards():
+    with pytest.raises(ValueError, match="At least one shard"):
+        ShardedQueue([])
+    with pytest.raises(ValueError, match="At least one shard"):
+        ShardedStream([])
@@ -9,6 +9,7 @@ import pytest_asyncio
 from freezegun import freeze_time
 from testcontainers.postgres import PostgresContainer  # type: ignore
 
+from colas.durability import Durability
 from colas.postgres.stream import PostgresStream
 from colas.sqlite.stream import SqliteStream
 from colas.stream import Stream
@@ -26,8 +27,12 @@ async def postgres_stream(postgres_stream_factory) -> PostgresStream:
 
 @pytest.fixture
 def sqlite_stream_factory(temp_db_file: Path):
-    async def factory(polling_interval: float = 0.1) -> SqliteStream:
-        return SqliteStream(str(temp_db_file), polling_interval=polling_interval)
+    async def factory(
+        polling_interval: float = 0.1, durability: Durability = "durable"
+    ) -> SqliteStream:
+        return SqliteStream(
+            str(temp_db_file), polling_interval=polling_interval, durability=durability
+        )
 
     return factory
 
@@ -36,11 +41,15 @@ def sqlite_stream_factory(temp_db_file: Path):
 def postgres_stream_factory(postgres_container: PostgresContainer):
     dsn = postgres_container.get_connection_url(driver=None)
 
-    async def factory(polling_interval: float = 0.1) -> PostgresStream:
+    async def factory(
+        polling_interval: float = 0.1, durability: Durability = "durable"
+    ) -> PostgresStream:
         from colas.postgres.connection import create_connection_pool
 
         pool = await create_connection_pool(dsn)
-        return PostgresStream(pool, polling_interval=polling_interval)
+        return PostgresStream(
+            pool, polling_interval=polling_interval, durability=durability
+        )
 
     return factory
 
@@ -74,6 +83,110 @@ async def test_store_and_poll(implementation: Stream):
     assert polled_stream[task_id_2] == result_2
 
 
+@pytest.mark.asyncio
+async def test_store_many(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+
+    results = {uuid.uuid4(): i for i in range(3)}
+    await stream_impl.store_many("test_stream", results)
+
+    polled_stream = await stream_impl.retrieve("test_stream", list(results))
+    assert polled_stream == results
+
+
+@pytest.mark.asyncio
+async def test_duplicate_store_keeps_first_result(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+
+    task_id = uuid.uuid4()
+    await stream_impl.store("test_stream", task_id, "first")
+    await stream_impl.store("test_stream", task_id, "second")
+    await stream_impl.store_many("test_stream", {task_id: "third"})
+    await stream_impl.append("test_stream", task_id, 0, "chunk")
+    await stream_impl.append("test_stream", task_id, 0, "chunk")
+
+    assert await stream_impl.retrieve("test_stream", [task_id]) == {task_id: "first"}
+    assert await stream_impl.read("test_stream", task_id, 0) == ["chunk"]
+
+
+@pytest.mark.asyncio
+async def test_append_and_read(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+
+    task_id = uuid.uuid4()
+    for seq, chunk in enumerate(["a", "b", "c"]):
+        await stream_impl.append("test_stream", task_id, seq, chunk)
+
+    assert await stream_impl.read("test_stream", task_id, 0) == ["a", "b", "c"]
+    assert await stream_impl.read("test_stream", task_id, 2) == ["c"]
+    assert await stream_impl.read("test_stream", task_id, 3) == []
+    assert await stream_impl.read("test_stream", uuid.uuid4(), 0) == []
+
+
+@pytest.mark.asyncio
+async def test_stats(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+    stats = await stream_impl.stats("test_stream")
+    assert (stats.results, stats.chunks, stats.oldest_age) == (0, 0, None)
+
+    task_ids = [uuid.uuid4() for _ in range(2)]
+    await stream_impl.store_many("test_stream", {task_id: 1 for task_id in task_ids})
+    for seq in range(3):
+        await stream_impl.append("test_stream", task_ids[0], seq, seq)
+
+    stats = await stream_impl.stats("test_stream")
+    assert (stats.results, stats.chunks) == (2, 3)
+    assert 0 <= stats.oldest_age < 60
+
+
+@pytest.mark.asyncio
+async def test_iterate(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+
+    task_id = uuid.uuid4()
+    for seq, chunk in enumerate([{"x": 1}, {"x": 2}]):
+        await stream_impl.append("test_stream", task_id, seq, chunk)
+    await stream_impl.store("test_stream", task_id, 2)
+
+    chunks = [chunk async for chunk in stream_impl.iterate("test_stream", task_id)]
+    assert chunks == [{"x": 1}, {"x": 2}]
+
+
+@pytest.mark.asyncio
+async def test_clean_chunks(implementation: Stream):
+    with freeze_time("2023-01-01 12:00:00") as freezer:
+        stream_impl = implementation
+        await stream_impl.init(["test_stream"])
+
+        task_id = uuid.uuid4()
+        await stream_impl.append("test_stream", task_id, 0, "old_chunk")
+        freezer.tick(timedelta(hours=2))
+        await stream_impl.append("test_stream", task_id, 1, "new_chunk")
+
+        await stream_impl.clean("test_stream", ttl=3600)
+
+        assert await stream_impl.read("test_stream", task_id, 0) == ["new_chunk"]
+
+
+@pytest.mark.asyncio
+async def test_ephemeral_stream(implementation_factory):
+    stream_impl = await implementation_factory(durability="ephemeral")
+    await stream_impl.init(["test_stream"])
+
+    task_id = uuid.uuid4()
+    await stream_impl.store("test_stream", task_id, {"result": 1})
+    await stream_impl.append("test_stream", task_id, 0, "chunk")
+    assert await stream_impl.retrieve("test_stream", [task_id]) == {
+        task_id: {"result": 1}
+    }
+    assert await stream_impl.read("test_stream", task_id, 0) == ["chunk"]
+
+
 @pytest.mark.asyncio
 async def test_poll_non_existent(implementation: Stream):
     stream_impl = implementation
@@ -179,6 +292,15 @@ async def test_wait_for_result_immediate(implementation: Stream):
     assert retrieved_result == expected_result
 
 
+@pytest.mark.asyncio
+async def test_wait_timeout(implementation: Stream):
+    stream_impl = implementation
+    await stream_impl.init(["test_stream"])
+
+    with pytest.raises(TimeoutError):
+        await stream_impl.wait("test_stream", uuid.uuid4(), timeout=0.05)
+
+
 @pytest.mark.asyncio
 async def test_wait_for_result_with_polling(implementation_factory):
     stream_impl = await implementation_factory(polling_interval=10)
@@ -186,7 +308,7 @@ async def test_wait_for_result_with_polling(implementation_factory):
     task_id = uuid.uuid4()
 
     with patch("colas.stream.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
-        mock_sleep.side_effect = asyncio.TimeoutError("Stop waiting")
+        mock_sleep.side_effect = TimeoutError("Stop waiting")
 
         with pytest.raises(asyncio.TimeoutError):
             await stream_impl.wait("test_stream", task_id)
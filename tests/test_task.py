@@ -0,0 +1,81 @@
+import dataclasses
+import uuid
+
+import msgpack  # type: ignore
+import pytest
+
+from colas.task import (
+    MAGIC,
+    VERSION,
+    Signature,
+    Task,
+    decode,
+    encode,
+    pack_result,
+    unpack_result,
+)
+
+
+def test_encode_has_versioned_header():
+    task = Task(task_id=uuid.uuid4(), name="task", args=(1,), kwargs={})
+    payload = encode(task)
+    assert payload[0] == MAGIC
+    assert payload[1] == VERSION
+
+
+def test_round_trip():
+    task = Task(
+        task_id=uuid.uuid4(),
+        name="task",
+        args=(1, [2, 3]),
+        kwargs={"a": "b"},
+        chain=(Signature(name="next", args=(4,), kwargs={"c": 5}),),
+        trace={"trace_id": "abc", "enqueued": 1.5},
+    )
+    decoded = decode(task.task_id, encode(task))
+    assert decoded == task
+    assert isinstance(decoded.args, tuple)
+    assert isinstance(decoded.args[1], list)
+    assert isinstance(decoded.chain[0].args, tuple)
+
+
+def test_decode_legacy_payloads():
+    task_id = uuid.uuid4()
+    decoded = decode(task_id, msgpack.packb(("task", [1, 2], {"a": 3})))
+    assert decoded == Task(task_id=task_id, name="task", args=(1, 2), kwargs={"a": 3})
+    assert decode(task_id, msgpack.packb(("task", [[1]], {}))).args == ([1],)
+
+    decoded = decode(
+        task_id,
+        msgpack.packb(("task", [], {}, [["next", [1], {}]], {"trace_id": "abc"})),
+    )
+    assert decoded.chain == (Signature(name="next", args=(1,), kwargs={}),)
+    assert decoded.trace == {"trace_id": "abc"}
+
+
+def test_decode_unsupported_version():
+    payload = bytes([MAGIC, VERSION + 1, 1, 0]) + msgpack.packb(("task", (), {}))
+    with pytest.raises(ValueError, match="Unsupported task envelope"):
+        decode(uuid.uuid4(), payload)
+
+
+def test_task_is_frozen_and_slotted():
+    task = Task(task_id=uuid.uuid4(), name="task", args=(), kwargs={})
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        task.name = "other"  # type: ignore[misc]
+    assert not hasattr(task, "__dict__")
+
+
+def test_result_envelope():
+    def stored(result):
+        return msgpack.unpackb(msgpack.packb(result))
+
+    trace = {"started": 1.5}
+    assert unpack_result(stored(pack_result([1, 2], trace))) == ([1, 2], trace, None)
+    assert unpack_result(stored(pack_result(None, trace, ["ValueError", "bad"]))) == (
+        None,
+        trace,
+        ["ValueError", "bad"],
+    )
+    assert unpack_result(stored(6)) == (6, {}, None)
+    assert unpack_result(stored([1, {"a": 2}])) == ([1, {"a": 2}], {}, None)
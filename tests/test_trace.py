@@ -0,0 +1,62 @@
+import json
+import uuid
+
+from colas.trace import JsonLinesExporter, breakdown, new_trace
+
+
+def test_new_trace():
+    trace = new_trace()
+    assert set(trace) == {"trace_id", "enqueued"}
+    assert new_trace(trace["trace_id"])["trace_id"] == trace["trace_id"]
+    assert new_trace()["trace_id"] != trace["trace_id"]
+
+
+def test_breakdown():
+    trace = {
+        "trace_id": "abc",
+        "enqueued": 1.0,
+        "popped": 1.5,
+        "started": 1.75,
+        "finished": 3.0,
+        "stored": 3.25,
+        "picked_up": 4.0,
+    }
+    assert breakdown(trace) == {
+        "queue_wait": 0.5,
+        "prefetch_wait": 0.25,
+        "execution": 1.25,
+        "store": 0.25,
+        "pickup": 0.75,
+        "delivery": 1.0,
+        "total": 3.0,
+    }
+
+
+def test_breakdown_partial():
+    trace = {"trace_id": "abc", "enqueued": 1.0, "popped": 2.0}
+    assert breakdown(trace) == {"queue_wait": 1.0}
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = JsonLinesExporter(path, buffer_size=3, flush_interval=3600)
+    task_ids = [uuid.uuid4(), uuid.uuid4()]
+    for task_id in task_ids:
+        exporter.export(
+            "mul", task_id, {"trace_id": "abc", "started": 1.0, "finished": 1.5}
+        )
+    assert not path.exists()
+    exporter.flush()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["task_id"] for span in spans] == [str(task_id) for task_id in task_ids]
+    assert spans[0]["name"] == "mul"
+    assert spans[0]["execution"] == 0.5
+
+
+def test_json_lines_exporter_flushes_full_buffer(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = JsonLinesExporter(path, buffer_size=2, flush_interval=3600)
+    for _ in range(3):
+        exporter.export("mul", uuid.uuid4(), {"trace_id": "abc"})
+    assert len(path.read_text().splitlines()) == 2